@@ -0,0 +1,147 @@
+"""
+Background job queue for long-running database operations
+Runs imports and exports on worker threads so the GUI stays responsive
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional
+
+from database import DatabaseManager, OperationCancelled
+
+
+class Job:
+    """A queued or running background job and its latest progress"""
+
+    def __init__(self, job_id: int, description: str, func: Callable,
+                 on_done: Optional[Callable] = None, writes: bool = False):
+        self.id = job_id
+        self.description = description
+        self.func = func
+        self.on_done = on_done
+        self.writes = writes
+        self.status = 'queued'  # queued, running, done, failed, cancelled
+        self.rows_done = 0
+        self.fraction = None
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """Ask the job to stop at its next progress report"""
+        self._cancel_event.set()
+        if self.status == 'queued':
+            self.status = 'cancelled'
+
+    def report_progress(self, rows_done: int, fraction: Optional[float] = None):
+        """Progress callback handed to DatabaseManager import/export methods"""
+        if self._cancel_event.is_set():
+            raise OperationCancelled()
+        self.rows_done = rows_done
+        self.fraction = fraction
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed', 'cancelled')
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.rows_done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds remaining, or None if the total is unknown"""
+        if not self.fraction or self.finished:
+            return None
+        return self.elapsed * (1 - self.fraction) / self.fraction
+
+    def summary(self) -> str:
+        """One-line description of the job for list boxes and status bars"""
+        text = f"#{self.id} {self.description}: {self.status}"
+        if self.status == 'running':
+            text += f", {self.rows_done:,} rows ({self.rows_per_second:,.0f} rows/s"
+            if self.eta is not None:
+                text += f", ETA {self.eta:.0f}s"
+            text += ")"
+        elif self.status == 'failed':
+            text += f" ({self.error})"
+        return text
+
+
+class JobQueue:
+    """
+    Runs jobs on a small thread pool plus a single writer thread
+
+    Each job is called as func(db, progress) where db is the shared
+    DatabaseManager and progress is the job's progress callback. The worker
+    thread holds its own pooled connection for the whole job, so make sure
+    the manager's pool_size leaves room for max_workers + 1 job threads and
+    the caller's thread. Callers poll the jobs from their own thread;
+    nothing here touches Tk.
+
+    SQLite has a single writer and an import holds the write lock for its
+    whole run, so jobs submitted with writes=True go to the writer thread
+    and run one at a time; a second import then waits in the writer's queue
+    instead of failing on the busy timeout. Read-only jobs (plain exports)
+    run on the pool, which queued writes never occupy.
+    """
+
+    def __init__(self, db: DatabaseManager, max_workers: int = 2):
+        self.db = db
+        self.jobs: List[Job] = []
+        self._ids = itertools.count(1)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='db-job')
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+
+    def submit(self, description: str, func: Callable[[DatabaseManager, Callable], Any],
+               on_done: Optional[Callable[[Job], None]] = None, writes: bool = False) -> Job:
+        """
+        Queue a job; on_done is stored on the job for the poller to call
+
+        writes marks a job that writes to the database (see the class
+        docstring); it stays queued until no other writing job is running.
+        """
+        job = Job(next(self._ids), description, func, on_done, writes)
+        self.jobs.append(job)
+        (self._writer if writes else self._executor).submit(self._run, job)
+        return job
+
+    def _run(self, job: Job):
+        if job.status == 'cancelled':
+            return
+        job.status = 'running'
+        job.started_at = time.monotonic()
+        try:
+            with self.db.connection():
+                job.result = job.func(self.db, job.report_progress)
+            job.status = 'done'
+        except OperationCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            job.error = e
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.monotonic()
+
+    def active_jobs(self) -> List[Job]:
+        """Jobs that are queued or running"""
+        return [job for job in self.jobs if not job.finished]
+
+    def shutdown(self):
+        """Cancel all outstanding jobs and wait for the workers to stop"""
+        for job in self.active_jobs():
+            job.cancel()
+        self._executor.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
@@ -3,8 +3,21 @@ Command-line interface for Email Marketing Lists and Employee Management
 Alternative to GUI for command-line users
 """
 
+import argparse
+import os
 import sys
-from database import DatabaseManager
+from contextlib import nullcontext
+from database import (DatabaseManager, PERFORMANCE_PROFILES, BACKUP_PAGES_PER_STEP, BACKUP_STEP_PAUSE,
+                      EXPORT_COMPRESSION_LEVEL_RANGES)
+
+
+# Detail views look up the same rows repeatedly; other processes' changes
+# show up after at most ENTITY_CACHE_TTL seconds
+ENTITY_CACHE_SIZE = 1024
+ENTITY_CACHE_TTL = 30
+# Imports commit (and checkpoint) about this often, so an interrupted import
+# can be resumed without redoing more than this many rows
+IMPORT_COMMIT_EVERY = 50000
 
 
 def print_menu():
@@ -18,6 +31,7 @@ def print_menu():
     print("4. Export Email List")
     print("5. Import Email List")
     print("6. View Statistics")
+    print("7. Maintenance")
     print("0. Exit")
     print("="*60)
 
@@ -36,13 +50,13 @@ def departments_menu(db):
         choice = input("\nEnter choice: ").strip()
         
         if choice == "1":
-            departments = db.get_all_departments()
+            departments = db.get_departments_with_heads()
             print("\nDepartments:")
             print("-" * 60)
             for dept in departments:
-                head = db.get_employee(dept['head_of_department_id']) if dept['head_of_department_id'] else None
-                head_name = head['name'] if head else "N/A"
-                print(f"ID: {dept['id']}, Name: {dept['name']}, Head: {head_name}")
+                head_name = dept['head_name'] or "N/A"
+                print(f"ID: {dept['id']}, Name: {dept['name']}, Head: {head_name}, "
+                      f"Employees: {dept['employee_count']}, Supervisors: {dept['supervisor_count']}")
         
         elif choice == "2":
             name = input("Department name: ").strip()
@@ -113,6 +127,7 @@ def employees_menu(db):
         print("4. Delete employee")
         print("5. View employee details")
         print("6. List employees by department")
+        print("7. Search employees")
         print("0. Back to main menu")
         
         choice = input("\nEnter choice: ").strip()
@@ -203,6 +218,15 @@ def employees_menu(db):
                 for emp in employees:
                     print(f"ID: {emp['id']}, Name: {emp['name']}, Email: {emp['email']}")
         
+        elif choice == "7":
+            query = input("Search (name, email or position): ").strip()
+            employees = db.search_employees(query)
+            print(f"\nEmployees matching '{query}':")
+            print("-" * 80)
+            for emp in employees:
+                print(f"ID: {emp['id']}, Name: {emp['name']}, Email: {emp['email']}, "
+                      f"Position: {emp.get('position') or 'N/A'}, Dept: {emp.get('department_name', 'N/A')}")
+        
         elif choice == "0":
             break
 
@@ -216,7 +240,10 @@ def emails_menu(db):
         print("3. Update subscription")
         print("4. Delete subscription")
         print("5. View subscription details")
-        print("6. Filter by status")
+        print("6. Filter by status/domain")
+        print("7. Bulk change status")
+        print("8. Bulk delete")
+        print("9. Search subscriptions")
         print("0. Back to main menu")
         
         choice = input("\nEnter choice: ").strip()
@@ -289,36 +316,124 @@ def emails_menu(db):
                     print("Subscription not found")
         
         elif choice == "6":
-            status = input("Status (active/unsubscribed/bounced): ").strip()
-            subscriptions = db.get_all_email_subscriptions(status)
-            print(f"\nEmail Subscriptions (Status: {status}):")
+            status = input("Status (active/unsubscribed/bounced, press Enter for all): ").strip() or None
+            domain = input("Email domain (press Enter for all): ").strip() or None
+            subscriptions = db.get_all_email_subscriptions(status, domain)
+            print(f"\nEmail Subscriptions (Status: {status or 'all'}, Domain: {domain or 'all'}):")
             print("-" * 80)
             for sub in subscriptions:
                 print(f"ID: {sub['id']}, Email: {sub['email']}, Subscribed: {sub['subscribed_at']}")
         
+        elif choice == "7":
+            new_status = input("New status (active/unsubscribed/bounced): ").strip()
+            ids, filters = read_bulk_selection()
+            if ids is None and not any(filters.values()):
+                print("Enter subscription IDs or at least one filter")
+                continue
+            try:
+                updated = db.bulk_update_email_status(new_status, ids, **filters)
+                print(f"{updated} subscriptions updated")
+            except Exception as e:
+                print(f"Error: {e}")
+        
+        elif choice == "8":
+            ids, filters = read_bulk_selection()
+            if ids is None and not any(filters.values()):
+                print("Enter subscription IDs or at least one filter")
+                continue
+            confirm = input("Are you sure? (yes/no): ").strip().lower()
+            if confirm == "yes":
+                try:
+                    deleted = db.bulk_delete_email_subscriptions(ids, **filters)
+                    print(f"{deleted} subscriptions deleted")
+                except Exception as e:
+                    print(f"Error: {e}")
+        
+        elif choice == "9":
+            query = input("Search (email, source or notes): ").strip()
+            subscriptions = db.search_subscriptions(query)
+            print(f"\nEmail Subscriptions matching '{query}':")
+            print("-" * 80)
+            for sub in subscriptions:
+                print(f"ID: {sub['id']}, Email: {sub['email']}, Status: {sub['status']}, "
+                      f"Source: {sub.get('source') or 'N/A'}")
+        
         elif choice == "0":
             break
 
 
+def read_bulk_selection():
+    """Ask for subscription IDs or a filter; returns (ids or None, filter kwargs)"""
+    while True:
+        ids_text = input("Subscription IDs, comma-separated (press Enter to use a filter): ").strip()
+        try:
+            ids = [int(i) for i in ids_text.split(",") if i.strip()] if ids_text else None
+            break
+        except ValueError:
+            print("Invalid IDs. Enter whole numbers separated by commas")
+    filters = {}
+    if ids is None:
+        filters['status'] = input("Current status (press Enter to skip): ").strip() or None
+        filters['source'] = input("Source (press Enter to skip): ").strip() or None
+        filters['domain'] = input("Email domain (press Enter to skip): ").strip() or None
+        filters['subscribed_after'] = input("Subscribed on/after (YYYY-MM-DD, press Enter to skip): ").strip() or None
+        filters['subscribed_before'] = input("Subscribed before (YYYY-MM-DD, press Enter to skip): ").strip() or None
+    return ids, filters
+
+
+def read_export_compression(format_type):
+    """Ask how to compress a CSV/JSON Lines export; returns (compression, level)"""
+    if format_type == "excel":
+        return None, None
+    compression = input("Compression (gzip/bz2/xz, press Enter for none): ").strip().lower() or None
+    if compression not in EXPORT_COMPRESSION_LEVEL_RANGES:
+        return compression, None
+    lowest, highest = EXPORT_COMPRESSION_LEVEL_RANGES[compression]
+    level = input(f"Compression level {lowest}-{highest} (press Enter for default): ").strip()
+    if level and not (level.isdigit() and lowest <= int(level) <= highest):
+        print(f"Invalid level, using the default for {compression}")
+        level = ""
+    return compression, int(level) if level else None
+
+
 def export_emails(db):
     """Export email list"""
     print("\n--- Export Email List ---")
-    format_type = input("Format (csv/excel): ").strip().lower()
+    format_type = input("Format (csv/jsonl/excel): ").strip().lower()
+    if format_type not in ("csv", "jsonl", "excel"):
+        print("Invalid format. Use 'csv', 'jsonl' or 'excel'")
+        return
+    compression, level = read_export_compression(format_type)
+    destination = input("Only changes since the last export to destination (press Enter for a full export): ").strip()
+    if destination:
+        export_changes(db, destination, format_type, compression, level)
+        return
     status = input("Filter by status (press Enter for all): ").strip() or None
+    domain = input("Filter by email domain (press Enter for all): ").strip() or None
+    workers = ""
+    if format_type != "excel":
+        workers = input("Worker processes for a sharded export (press Enter for a single file): ").strip()
     
-    filename = input("Output filename: ").strip()
+    filename = input("Output filename prefix: " if workers else "Output filename: ").strip()
     if not filename:
         print("Filename is required")
         return
     
+    use_snapshot = input("Export from a point-in-time snapshot, leaving the live database free? (yes/no): ").strip().lower() == "yes"
+    
     try:
-        if format_type == "csv":
-            success = db.export_emails_to_csv(filename, status)
-        elif format_type == "excel":
-            success = db.export_emails_to_excel(filename, status)
-        else:
-            print("Invalid format. Use 'csv' or 'excel'")
-            return
+        with db.snapshot() if use_snapshot else nullcontext(db) as source:
+            if workers:
+                export_shards(source, filename, format_type, compression, level, int(workers), status, domain)
+                return
+            if format_type == "csv":
+                success = source.export_emails_to_csv(filename, status, domain=domain,
+                                                      compression=compression, compression_level=level)
+            elif format_type == "jsonl":
+                success = source.export_emails_to_jsonl(filename, status, domain=domain,
+                                                        compression=compression, compression_level=level)
+            else:
+                success = source.export_emails_to_excel(filename, status, domain=domain)
         
         if success:
             print(f"Email list exported successfully to {filename}")
@@ -328,6 +443,39 @@ def export_emails(db):
         print(f"Error: {e}")
 
 
+def export_shards(db, prefix, format_type, compression, level, workers, status, domain):
+    """Export the email list in parallel into shard files and a manifest"""
+    try:
+        manifest = db.export_emails_sharded(prefix, format_type, compression, level, workers=workers,
+                                            status=status, domain=domain)
+        if manifest:
+            print(f"{manifest['total_rows']} subscriptions exported to {len(manifest['shards'])} shards")
+            for shard in manifest['shards']:
+                print(f"  {shard['file']}: {shard['rows']} rows, sha256 {shard['sha256']}")
+            print(f"Manifest written to {prefix}.manifest.json")
+        else:
+            print("Export failed")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
+def export_changes(db, destination, format_type, compression=None, level=None):
+    """Export the subscriptions changed since the last export to destination"""
+    filename = input("Output filename (press Enter for a dated name): ").strip() or None
+    
+    try:
+        result = db.export_changes_since(destination, format_type, filename,
+                                         compression=compression, compression_level=level)
+        if result:
+            since = f"change {result['since']}" if result['since'] is not None else "the beginning"
+            print(f"Changes since {since} exported to {result['filename']}")
+            print(f"Upserts: {result['upserts']}, Deletes: {result['deletes']}")
+        else:
+            print("Export failed")
+    except Exception as e:
+        print(f"Error: {e}")
+
+
 def import_emails(db):
     """Import email list"""
     print("\n--- Import Email List ---")
@@ -337,40 +485,213 @@ def import_emails(db):
         print("Filename is required")
         return
     
+    resume = False
+    unfinished = [job for job in db.get_import_jobs()
+                  if job['filename'] == os.path.abspath(filename)]
+    if unfinished:
+        job = unfinished[0]
+        answer = input(f"Import job {job['id']} of this file stopped after {job['rows_read']} rows. "
+                       f"Resume it? (yes/no): ").strip().lower()
+        resume = answer == "yes"
+    workers = input("Parser processes for large files (press Enter for 1): ").strip()
+    
     try:
-        successful, failed = db.import_emails_from_csv(filename)
-        print(f"\nImport completed!")
-        print(f"Successful imports: {successful}")
-        print(f"Failed imports: {failed}")
+        result = db.import_emails_from_csv(filename, commit_every=IMPORT_COMMIT_EVERY,
+                                           workers=int(workers) if workers else 1,
+                                           resume=resume)
+        print_import_result(result)
     except Exception as e:
         print(f"Error: {e}")
 
 
+def print_import_result(result):
+    """Print the counts of a finished import"""
+    successful, failed = result
+    print(f"\nImport completed!")
+    print(f"Successful imports: {successful}")
+    print(f"Skipped duplicates: {result.skipped}")
+    print(f"Failed imports: {failed}")
+    if result.reject_file:
+        print(f"Rejected rows and reasons written to: {result.reject_file}")
+
+
+def import_jobs_menu(db):
+    """List, resume or abandon unfinished imports"""
+    while True:
+        jobs = db.get_import_jobs()
+        print("\n--- Unfinished Imports ---")
+        if not jobs:
+            print("No unfinished imports")
+        for job in jobs:
+            print(f"ID: {job['id']}, File: {job['filename']}, Rows read: {job['rows_read']}, "
+                  f"Imported: {job['successful']}, Started: {job['started_at']}, "
+                  f"Last checkpoint: {job['updated_at']}")
+        print("\n1. Resume an import")
+        print("2. Abandon an import")
+        print("0. Back")
+        
+        choice = input("\nEnter choice: ").strip()
+        
+        if choice == "1":
+            job_id = input("Import job ID: ").strip()
+            if job_id:
+                try:
+                    result = db.resume_import_job(int(job_id), commit_every=IMPORT_COMMIT_EVERY)
+                    print_import_result(result)
+                except Exception as e:
+                    print(f"Error: {e}")
+        
+        elif choice == "2":
+            job_id = input("Import job ID: ").strip()
+            if job_id:
+                if db.abandon_import_job(int(job_id)):
+                    print("Import abandoned")
+                else:
+                    print("No unfinished import with that ID")
+        
+        elif choice == "0":
+            break
+
+
+def backup_database(db, filename, pages_per_step=BACKUP_PAGES_PER_STEP, pause=BACKUP_STEP_PAUSE):
+    """Copy the live database to filename with the online backup API"""
+    def progress(pages, fraction):
+        # fraction is None while SQLite does not know the page count yet
+        done = f" ({fraction:.0%})" if fraction is not None else ""
+        print(f"\r  {pages} pages copied{done}", end="", flush=True)
+    
+    try:
+        success = db.backup(filename, pages_per_step, pause, progress=progress)
+        print()
+        if success:
+            print(f"Database backed up to {filename}")
+        else:
+            print("Backup failed")
+        return success
+    except Exception as e:
+        print(f"\nError: {e}")
+        return False
+
+
 def view_statistics(db):
     """View database statistics"""
     print("\n--- Database Statistics ---")
+    use_snapshot = input("Read from a point-in-time snapshot, leaving the live database free? (yes/no): ").strip().lower() == "yes"
+    
+    try:
+        with db.snapshot() if use_snapshot else nullcontext(db) as source:
+            stats = source.get_statistics()
+            domains = source.get_domain_breakdown(status='active', top_n=10)
+    except Exception as e:
+        print(f"Error: {e}")
+        return
     
-    departments = db.get_all_departments()
-    employees = db.get_all_employees()
-    subscriptions = db.get_all_email_subscriptions()
+    print(f"Total Departments: {stats['total_departments']}")
+    print(f"Total Employees: {stats['total_employees']}")
+    print(f"Total Email Subscriptions: {stats['total_subscriptions']}")
+    print(f"Active Email Subscriptions: {stats['subscriptions_by_status']['active']}")
     
-    active_emails = len([s for s in subscriptions if s['status'] == 'active'])
+    print("\nSubscriptions by Source:")
+    for source, count in stats['subscriptions_by_source'].items():
+        print(f"  {source or 'N/A'}: {count}")
     
-    print(f"Total Departments: {len(departments)}")
-    print(f"Total Employees: {len(employees)}")
-    print(f"Total Email Subscriptions: {len(subscriptions)}")
-    print(f"Active Email Subscriptions: {active_emails}")
+    print("\nTop Domains (active subscriptions):")
+    for row in domains:
+        print(f"  {row['domain']}: {row['count']}")
     
     print("\nDepartments Breakdown:")
-    for dept in departments:
-        dept_employees = db.get_employees_by_department(dept['id'])
-        supervisors = db.get_supervisors_by_department(dept['id'])
-        print(f"  {dept['name']}: {len(dept_employees)} employees, {len(supervisors)} supervisors")
+    for dept in stats['departments']:
+        print(f"  {dept['name']}: {dept['employee_count']} employees, {dept['supervisor_count']} supervisors")
+
+
+def maintenance_menu(db):
+    """Database maintenance menu"""
+    while True:
+        print("\n--- Maintenance ---")
+        print("1. Rebuild summary counters")
+        print("2. Rebuild search index")
+        print("3. Merge duplicate subscriptions")
+        print("4. Unfinished imports")
+        print("5. Online backup")
+        print("0. Back to main menu")
+        
+        choice = input("\nEnter choice: ").strip()
+        
+        if choice == "1":
+            try:
+                db.rebuild_summary_counts()
+                print("Summary counters rebuilt")
+            except Exception as e:
+                print(f"Error: {e}")
+        
+        elif choice == "2":
+            try:
+                db.rebuild_search_index()
+                print("Search index rebuilt")
+            except Exception as e:
+                print(f"Error: {e}")
+        
+        elif choice == "3":
+            confirm = input("Duplicates will be deleted after merging. Continue? (yes/no): ").strip().lower()
+            if confirm == "yes":
+                try:
+                    report = db.dedupe_email_subscriptions()
+                    print(f"{report['groups']} duplicate groups merged, {report['removed']} subscriptions removed")
+                    for merge in report['merges'][:20]:
+                        print(f"  Kept {merge['kept_email']} (ID: {merge['kept_id']}), "
+                              f"merged: {', '.join(merge['merged_emails'])}")
+                    if report['groups'] > 20:
+                        print(f"  ... and {report['groups'] - 20} more")
+                except Exception as e:
+                    print(f"Error: {e}")
+        
+        elif choice == "4":
+            import_jobs_menu(db)
+        
+        elif choice == "5":
+            filename = input("Backup filename: ").strip()
+            pages = input(f"Pages per step (press Enter for {BACKUP_PAGES_PER_STEP}): ").strip()
+            if filename:
+                backup_database(db, filename, int(pages) if pages else BACKUP_PAGES_PER_STEP)
+        
+        elif choice == "0":
+            break
 
 
 def main():
     """Main CLI application"""
-    db = DatabaseManager()
+    parser = argparse.ArgumentParser(description="Email Marketing & Employee Management CLI")
+    parser.add_argument("--profile", choices=list(PERFORMANCE_PROFILES), default="balanced",
+                        help="SQLite performance profile (default: balanced)")
+    parser.add_argument("--seed-sample-data", action="store_true",
+                        help="Load the sample departments, employees and subscriptions")
+    parser.add_argument("--provider-rules", action="store_const", const=True,
+                        help="Treat gmail dots and +tags as the same address when detecting duplicates "
+                             "(stored in the database)")
+    parser.add_argument("--no-provider-rules", dest="provider_rules", action="store_const", const=False,
+                        help="Switch provider rules off again")
+    parser.add_argument("--backup", metavar="FILE",
+                        help="Back up the database to FILE while it stays in use, then exit")
+    parser.add_argument("--pages-per-step", type=int, default=BACKUP_PAGES_PER_STEP,
+                        help=f"Pages copied per backup step (default: {BACKUP_PAGES_PER_STEP})")
+    parser.add_argument("--backup-pause", type=float, default=BACKUP_STEP_PAUSE,
+                        help=f"Seconds to pause between backup steps (default: {BACKUP_STEP_PAUSE})")
+    args = parser.parse_args()
+    
+    db = DatabaseManager(profile=args.profile, cache_size=ENTITY_CACHE_SIZE,
+                         cache_ttl=ENTITY_CACHE_TTL)
+    if args.provider_rules is not None:
+        report = db.set_email_provider_rules(args.provider_rules)
+        if report:
+            print(f"Provider rules switched {'on' if args.provider_rules else 'off'}: "
+                  f"{report['groups']} duplicate groups merged, {report['removed']} subscriptions removed")
+    if args.seed_sample_data:
+        db.seed_sample_data()
+    if args.backup:
+        success = backup_database(db, args.backup, args.pages_per_step, args.backup_pause)
+        db.close()
+        sys.exit(0 if success else 1)
+    print(f"Database: {db.describe_settings()}")
     
     try:
         while True:
@@ -389,6 +710,8 @@ def main():
                 import_emails(db)
             elif choice == "6":
                 view_statistics(db)
+            elif choice == "7":
+                maintenance_menu(db)
             elif choice == "0":
                 print("Goodbye!")
                 break
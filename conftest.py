@@ -0,0 +1,28 @@
+"""
+Shared pytest fixtures
+"""
+
+import pytest
+
+import database
+from database import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # Fail fast instead of waiting 5 s for a lock the test holds on purpose
+    monkeypatch.setitem(database.PERFORMANCE_PROFILES['balanced'], 'busy_timeout', 100)
+    manager = DatabaseManager(str(tmp_path / "test.db"))
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def write_csv(tmp_path):
+    """Write an import file with the standard header and return its path"""
+    def write(name, rows):
+        path = tmp_path / name
+        path.write_text("email,status,source,notes\n" + "".join(row + "\n" for row in rows),
+                        encoding='utf-8')
+        return str(path)
+    return write
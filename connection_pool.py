@@ -0,0 +1,139 @@
+"""
+Bounded SQLite connection pool
+Lets several threads share one DatabaseManager, each using its own connection
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes free within the checkout timeout"""
+
+
+class ConnectionPool:
+    """
+    Hands out at most max_size connections created by factory
+
+    Idle connections are reused most-recently-used first. A checkout that
+    finds the pool exhausted waits for a checkin, and the time spent waiting
+    is recorded so the pool can be sized from get_stats().
+    """
+
+    def __init__(self, factory: Callable[[], sqlite3.Connection], max_size: int = 5,
+                 timeout: float = 30.0):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._closed = False
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def checkout(self) -> sqlite3.Connection:
+        """Take a connection from the pool, creating one if there is room"""
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Cannot use a closed connection pool")
+            try:
+                conn = self._idle.get_nowait()
+                self._hits += 1
+                self._in_use += 1
+                return conn
+            except queue.Empty:
+                pass
+            if self._created < self.max_size:
+                # Reserve the slot before the (slow) connect outside the lock
+                self._created += 1
+                self._misses += 1
+                self._in_use += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self.factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                    self._in_use -= 1
+                raise
+
+        started = time.monotonic()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeoutError(
+                f"No database connection became free within {self.timeout}s "
+                f"(pool size {self.max_size})"
+            )
+        waited = time.monotonic() - started
+        with self._lock:
+            self._hits += 1
+            self._waits += 1
+            self._in_use += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        return conn
+
+    def checkin(self, conn: sqlite3.Connection):
+        """Return a connection, discarding any transaction left open on it"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._in_use -= 1
+            if self._closed:
+                self._created -= 1
+                conn.close()
+                return
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and back in"""
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def close(self):
+        """Close idle connections now and busy ones as they are checked in"""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._created -= 1
+                conn.close()
+
+    def get_stats(self) -> Dict:
+        """Pool usage counters: hits reuse an idle connection, misses open a new one"""
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'open': self._created,
+                'in_use': self._in_use,
+                'idle': self._created - self._in_use,
+                'hits': self._hits,
+                'misses': self._misses,
+                'waits': self._waits,
+                'total_wait_time': self._total_wait,
+                'max_wait_time': self._max_wait,
+                'avg_wait_time': self._total_wait / self._waits if self._waits else 0.0,
+            }
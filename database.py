@@ -4,66 +4,829 @@ Provides CRUD operations for all tables
 """
 
 import sqlite3
+import bz2
 import csv
+import gzip
+import io
+import lzma
+import re
+import functools
+import hashlib
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import closing, contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Callable, Iterable, Iterator
+import json
+import mmap
 import os
+import pathlib
+import tempfile
+import time
+
+from connection_pool import ConnectionPool
+from email_utils import EmailValidator, normalize_email
+from entity_cache import EntityCache
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(BASE_DIR, 'migrations')
+SAMPLE_DATA_FILE = os.path.join(BASE_DIR, 'sample_data.sql')
+
+# Ordered schema migrations in MIGRATIONS_DIR. Migration N brings the database
+# to PRAGMA user_version N; only ever append to this list.
+MIGRATIONS = [
+    '0001_initial_schema.sql',
+    '0002_summary_counts.sql',
+    '0003_search_index.sql',
+    '0004_email_domain.sql',
+    '0005_email_key.sql',
+    '0006_import_jobs.sql',
+    '0007_change_tracking.sql',
+    '0008_email_key_writers.sql',
+    '0009_change_sequence.sql',
+    '0010_email_sort_indexes.sql',
+    '0011_domain_page_indexes.sql',
+    '0012_settings.sql',
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+EMAIL_STATUSES = ('active', 'unsubscribed', 'bounced')
+
+# Recomputes summary_counts from scratch (see migrations/0002_summary_counts.sql)
+SUMMARY_COUNTS_REBUILD_SQL = [
+    "DELETE FROM summary_counts",
+    """INSERT INTO summary_counts (scope, key, count)
+       SELECT 'subscription_status', COALESCE(status, ''), COUNT(*) FROM email_subscriptions GROUP BY 2""",
+    """INSERT INTO summary_counts (scope, key, count)
+       SELECT 'subscription_source', COALESCE(source, ''), COUNT(*) FROM email_subscriptions GROUP BY 2""",
+    """INSERT INTO summary_counts (scope, key, count)
+       SELECT 'department_employees', department_id, COUNT(*) FROM employees GROUP BY 2""",
+    """INSERT INTO summary_counts (scope, key, count)
+       SELECT 'department_supervisors', department_id, SUM(CASE WHEN is_supervisor THEN 1 ELSE 0 END)
+       FROM employees GROUP BY 2""",
+    """INSERT INTO summary_counts (scope, key, count)
+       SELECT 'department_heads', department_id, SUM(CASE WHEN is_head THEN 1 ELSE 0 END)
+       FROM employees GROUP BY 2""",
+]
+
+# Number of CSV rows sent to SQLite per executemany() call during imports
+IMPORT_BATCH_SIZE = 1000
+
+# Size of the blocks imports decode and parse at once. Blocks end on a row
+# boundary; they are also the unit handed to worker processes by parallel
+# imports and the granularity of import checkpoints.
+IMPORT_CHUNK_BYTES = 1024 * 1024
+
+# One CSV row, read the way the csv module reads it: a quote only opens a
+# quoted field at the start of a field (inside one, "" is a literal quote
+# and line breaks are data); anywhere else it is an ordinary character, as
+# in 5ft 10" tall. Possessive repeats keep the match linear.
+CSV_ROW_PATTERN = re.compile(rb'(?:[^"\n]++|(?<![^,\n\r])"(?:[^"]++|"")*+"|(?<=[^,\n\r])")*+\n')
+CSV_ROWS_PATTERN = re.compile(rb'(?:%s)*+' % CSV_ROW_PATTERN.pattern)
+
+# Columns read from import files, in insert order
+IMPORT_COLUMNS = ('email', 'status', 'source', 'notes')
+
+# Columns of the reject file written by imports: the input line number and
+# the reason, followed by the row as it was read
+REJECT_FILE_COLUMNS = ['line', 'reason', 'email', 'status', 'source', 'notes']
+
+# Sortable subscription columns and the SQL expression used to order by them.
+# source is optional, so it is coalesced to keep keyset comparisons away from NULL;
+# migrations/0010_email_sort_indexes.sql indexes each of them.
+EMAIL_SORT_COLUMNS = {
+    'id': 'id',
+    'email': 'email',
+    'subscribed_at': 'subscribed_at',
+    'status': 'status',
+    'source': "COALESCE(source, '')",
+}
+
+# Ids bound per statement in bulk operations; stays under the 999-variable
+# limit of older SQLite builds
+BULK_ID_CHUNK_SIZE = 900
+
+# Number of rows fetched from the cursor at a time during exports
+EXPORT_CHUNK_SIZE = 1000
+
+# Columns written by the CSV/Excel exports, in file order. Derived columns
+# such as domain and email_key are left out so the file layout matches the import format.
+SUBSCRIPTION_EXPORT_COLUMNS = ('id', 'email', 'subscribed_at', 'status', 'source', 'notes')
+
+# Rows per worksheet in .xlsx files, including the header row
+EXCEL_MAX_ROWS = 1048576
+
+# Value written to email_subscriptions.updated_at: UTC with milliseconds, the
+# same as the triggers in migrations/0007_change_tracking.sql
+CHANGE_TIMESTAMP_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# Change numbers (see migrations/0009_change_sequence.sql): each write runs
+# NEXT_CHANGE_SEQ_SQL once in its transaction and stamps the rows it changes
+# with CHANGE_SEQ_SQL. Delta exports use them as their watermark.
+NEXT_CHANGE_SEQ_SQL = "UPDATE change_sequence SET value = value + 1"
+CHANGE_SEQ_SQL = "(SELECT value FROM change_sequence)"
+
+# File extension of each export format
+EXPORT_FORMAT_EXTENSIONS = {'csv': '.csv', 'jsonl': '.jsonl', 'excel': '.xlsx'}
+
+# Compressed CSV/JSON Lines exports: file extension (also used to infer the
+# compression from a filename), default level and accepted levels of each
+# codec. Higher levels are slower and smaller; gzip 0 stores without
+# compressing, and bz2 has no level 0.
+EXPORT_COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'bz2': '.bz2', 'xz': '.xz'}
+EXPORT_COMPRESSION_LEVELS = {'gzip': 6, 'bz2': 9, 'xz': 6}
+EXPORT_COMPRESSION_LEVEL_RANGES = {'gzip': (0, 9), 'bz2': (1, 9), 'xz': (0, 9)}
+
+# Block size used when checksumming sharded export files
+SHARD_CHECKSUM_BLOCK_BYTES = 1024 * 1024
+
+# Online backups copy this many pages per step and pause this many seconds
+# between steps; other connections can use the database in between
+BACKUP_PAGES_PER_STEP = 1024
+BACKUP_STEP_PAUSE = 0.01
+
+# Default number of rows returned by the full-text search methods
+SEARCH_LIMIT = 50
+
+# Default number of domains returned by get_domain_breakdown()
+DOMAIN_BREAKDOWN_TOP_N = 20
+
+
+# Named SQLite tuning profiles applied to every pooled connection.
+# cache_size is negative KiB as SQLite expects; busy_timeout is in milliseconds.
+PERFORMANCE_PROFILES = {
+    # Every commit is fsynced; smallest memory footprint
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -8000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 5000,
+    },
+    # WAL with synchronous=NORMAL cannot corrupt the database, only lose the
+    # last commits on power failure; the right default for interactive use
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -32000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    # Large imports: no fsyncs, big cache, long wait for competing writers
+    'bulk-load': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'cache_size': -256000,
+        'mmap_size': 1024 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 30000,
+    },
+}
+
+SYNCHRONOUS_NAMES = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+TEMP_STORE_NAMES = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}
+
+
+# Progress callbacks receive (rows_done, fraction_done); fraction_done is None
+# when the total is unknown. A callback may raise OperationCancelled to abort.
+ProgressCallback = Callable[[int, Optional[float]], None]
+
+
+class OperationCancelled(Exception):
+    """Raised by a progress callback to abort a running import or export"""
+
+
+class ImportResult(tuple):
+    """
+    (successful, failed) tuple that also carries the skipped-duplicate count,
+    the path of the reject file (None when no row was rejected) and the id
+    of the import_jobs row
+    """
+    
+    def __new__(cls, successful: int, failed: int, skipped: int = 0,
+                reject_file: Optional[str] = None, job_id: Optional[int] = None):
+        result = super().__new__(cls, (successful, failed))
+        result.skipped = skipped
+        result.reject_file = reject_file
+        result.job_id = job_id
+        return result
+    
+    @property
+    def successful(self) -> int:
+        return self[0]
+    
+    @property
+    def failed(self) -> int:
+        return self[1]
+
+
+def _chunks(items: Iterable, size: int) -> Iterator[List]:
+    """Yield successive lists of at most size items"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _split_sql(script: str) -> List[str]:
+    """Split a SQL script into complete statements (trigger bodies stay intact)"""
+    statements = []
+    buffer = ''
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ''
+    return statements
+
+
+def _import_column_positions(fieldnames: List[str]) -> Tuple[Tuple[int, ...], int]:
+    """
+    Map IMPORT_COLUMNS to their positions in the header
+    
+    Returns (positions, width). Rows are padded to width, and columns the
+    header does not have point at the last padding slot, which is always
+    None, so fields can be picked by index without per-field checks.
+    """
+    width = len(fieldnames) + 1
+    # A repeated column name maps to its last occurrence, as csv.DictReader does
+    index = {name: position for position, name in enumerate(fieldnames)}
+    return tuple(index.get(column, width - 1) for column in IMPORT_COLUMNS), width
+
+
+def _parse_import_block(text: str, positions: Tuple[int, ...], width: int,
+                        check_email: Optional[Callable[[str], Optional[str]]],
+                        email_key: Callable[[str], str]):
+    """
+    Parse and clean one block of CSV rows for insertion into email_subscriptions
+    
+    Rows are read as lists and fields picked by header position, so no dict
+    is built per row. Returns (insert values, rejects as (line, fields,
+    reason), rows read, lines read) with line numbers relative to the
+    block. Shared by the serial import and the parallel import workers so
+    both treat rows identically.
+    """
+    email_at, status_at, source_at, notes_at = positions
+    padding = [None] * width
+    values = []
+    rejects = []
+    rows = 0
+    reader = csv.reader(io.StringIO(text, newline=''))
+    for row in reader:
+        if not row:
+            continue
+        rows += 1
+        if len(row) < width:
+            row.extend(padding[len(row):])
+        email = (row[email_at] or '').strip()
+        if not email:
+            rejects.append((reader.line_num, row, "missing email"))
+            continue
+        if check_email:
+            reason = check_email(email)
+            if reason:
+                rejects.append((reader.line_num, row, reason))
+                continue
+        
+        status = (row[status_at] or '').strip() or 'active'
+        if status not in EMAIL_STATUSES:
+            rejects.append((reader.line_num, row, f"invalid status '{status}'"))
+            continue
+        source = (row[source_at] or '').strip() or None
+        notes = (row[notes_at] or '').strip() or None
+        values.append((email, email_key(email), status, source, notes))
+    # Keep only the imported columns of rejected rows
+    rejects = [(line, [row[i] for i in positions], reason) for line, row, reason in rejects]
+    return values, rejects, rows, reader.line_num
+
+
+def _row_aligned_ranges(mm: mmap.mmap, start: int, size: int, chunk_bytes: int) -> Iterator[Tuple[int, int]]:
+    """
+    Yield (start, end) byte ranges of at most chunk_bytes that end on a row boundary
+    
+    Each range holds the whole rows (CSV_ROW_PATTERN) that fit in
+    chunk_bytes, so quoted fields containing line breaks are never split. A
+    single row longer than chunk_bytes gets a range of its own.
+    """
+    while start < size:
+        if size - start <= chunk_bytes:
+            yield start, size
+            return
+        end = CSV_ROWS_PATTERN.match(mm, start, start + chunk_bytes).end()
+        if end == start:
+            row = CSV_ROW_PATTERN.match(mm, start)
+            # No match: the file ends inside a quoted field
+            end = row.end() if row else size
+        yield start, end
+        start = end
+
+
+# Per-process state of parallel import workers, set up by _init_import_worker
+_worker_check_email = None
+_worker_email_key = None
+
+
+def _init_import_worker(disposable_domains: Optional[List[str]], provider_rules: bool):
+    """ProcessPoolExecutor initializer: build the validator once per worker"""
+    global _worker_check_email, _worker_email_key
+    _worker_check_email = (EmailValidator(disposable_domains).validate
+                           if disposable_domains is not None else None)
+    _worker_email_key = functools.partial(normalize_email, provider_rules=provider_rules)
+
+
+def _parse_import_chunk(filename: str, start: int, end: int,
+                        positions: Tuple[int, ...], width: int):
+    """Worker process side of a parallel import: _parse_import_block() for one byte range"""
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    return _parse_import_block(text, positions, width, _worker_check_email, _worker_email_key) + (end,)
+
+
+def _export_shard(db_uri: str, busy_timeout: float, sql: str, params: Tuple, filename: str,
+                  fmt: str, compression: Optional[str], compression_level: Optional[int]):
+    """
+    Write one shard of a sharded export in a worker process
+    
+    Reads through its own read-only connection and returns (rows written,
+    file size, SHA-256 of the file).
+    """
+    rows_written = 0
+    
+    def chunks(cursor):
+        nonlocal rows_written
+        yield [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            rows_written += len(rows)
+            yield rows
+    
+    with closing(sqlite3.connect(db_uri, uri=True, timeout=busy_timeout)) as conn:
+        write = DatabaseManager._write_jsonl_export if fmt == 'jsonl' else DatabaseManager._write_csv_export
+        write(filename, chunks(conn.execute(sql, params)), 0, None, compression, compression_level)
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(SHARD_CHECKSUM_BLOCK_BYTES), b''):
+            digest.update(block)
+    return rows_written, os.path.getsize(filename), digest.hexdigest()
+
+
+def _ordered_results(executor, func: Callable, calls: Iterable[Tuple], window: int) -> Iterator:
+    """
+    Like executor.map, but with at most window calls in flight
+    
+    Keeps memory bounded when the consumer (the single SQLite writer) is
+    slower than the workers; results come back in submission order.
+    """
+    pending = deque()
+    try:
+        for args in calls:
+            pending.append(executor.submit(func, *args))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _export_compression(filename: str, compression: Optional[str],
+                        compression_level: Optional[int] = None) -> Optional[str]:
+    """
+    Validate compression, or infer it from the filename's extension if None
+    
+    Also raises ValueError if compression_level is outside the codec's
+    EXPORT_COMPRESSION_LEVEL_RANGES, so a bad level fails before anything
+    is written.
+    """
+    if compression is None:
+        compression = next((name for name, extension in EXPORT_COMPRESSION_EXTENSIONS.items()
+                            if filename.lower().endswith(extension)), None)
+    elif compression not in EXPORT_COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unknown compression '{compression}'")
+    if compression is not None and compression_level is not None:
+        lowest, highest = EXPORT_COMPRESSION_LEVEL_RANGES[compression]
+        if not lowest <= compression_level <= highest:
+            raise ValueError(f"{compression} compression levels go from {lowest} to {highest}, "
+                             f"not {compression_level}")
+    return compression
+
+
+def _open_export_file(filename: str, compression: Optional[str] = None,
+                      compression_level: Optional[int] = None):
+    """Open a text file for an export, writing through a gzip, bz2 or xz stream if asked"""
+    if compression is None:
+        return open(filename, 'w', newline='', encoding='utf-8')
+    if compression_level is None:
+        compression_level = EXPORT_COMPRESSION_LEVELS[compression]
+    if compression == 'gzip':
+        return gzip.open(filename, 'wt', compresslevel=compression_level, newline='', encoding='utf-8')
+    if compression == 'bz2':
+        return bz2.open(filename, 'wt', compresslevel=compression_level, newline='', encoding='utf-8')
+    return lzma.open(filename, 'wt', preset=compression_level, newline='', encoding='utf-8')
+
+
+def _fts_query(text: str) -> Optional[str]:
+    """
+    Turn free text typed by a user into an FTS5 prefix query
+    
+    Each whitespace-separated word becomes a quoted phrase of its tokens
+    with a prefix match on the last one, so "john.sm gmail" matches
+    john.smith@gmail.com. Words are ANDed together. Returns None when the
+    text contains nothing searchable.
+    """
+    phrases = []
+    for word in text.split():
+        tokens = re.findall(r'\w+', word)
+        if tokens:
+            phrases.append('"' + ' '.join(tokens) + '"*')
+    return ' '.join(phrases) or None
+
+
+def _with_connection(method):
+    """Run a DatabaseManager method with a pooled connection pinned to the calling thread"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.connection():
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class DatabaseManager:
-    """Manages database operations for email marketing and employee management"""
+    """
+    Manages database operations for email marketing and employee management
+    
+    Safe to share between threads: connections come from a bounded pool and
+    each thread works on the one it has checked out.
     
-    def __init__(self, db_name: str = "email_marketing.db"):
-        """Initialize database connection"""
+    With cache_size > 0, get_department, get_employee, get_email_subscription
+    and get_email_subscription_by_email are served from an LRU cache that the
+    write methods of this manager invalidate after they commit. cache_ttl
+    bounds how long changes made by other processes can go unnoticed.
+    """
+    
+    def __init__(self, db_name: str = "email_marketing.db", pool_size: int = 5,
+                 pool_timeout: float = 30.0, profile: str = 'balanced',
+                 cache_size: int = 0, cache_ttl: Optional[float] = None,
+                 email_provider_rules: Optional[bool] = None):
+        """
+        Initialize the connection pool and make sure the schema exists
+        
+        email_provider_rules makes duplicate detection also treat provider
+        aliases (gmail dots, "+tag" suffixes) as the same address. The
+        setting is stored in the database so every process computes the same
+        keys; None uses the stored setting, True or False changes it through
+        set_email_provider_rules().
+        """
+        if profile not in PERFORMANCE_PROFILES:
+            raise ValueError(
+                f"Unknown performance profile '{profile}'. "
+                f"Choose from: {', '.join(PERFORMANCE_PROFILES)}"
+            )
         self.db_name = db_name
-        self.conn = None
-        self.connect()
-        self.create_tables()
+        self.profile = profile
+        self.email_provider_rules = False
+        if db_name == ':memory:':
+            # Every connection to :memory: is a separate database
+            pool_size = 1
+        self.pool = ConnectionPool(self.connect, pool_size, pool_timeout)
+        self._local = threading.local()
+        self.cache = EntityCache(cache_size, cache_ttl) if cache_size else None
+        self.email_validator = EmailValidator()
+        self.migrate()
+        with self.connection():
+            self.email_provider_rules = self._stored_email_provider_rules()
+        if email_provider_rules is not None:
+            self.set_email_provider_rules(email_provider_rules)
+    
+    def connect(self) -> sqlite3.Connection:
+        """Open a new database connection tuned by the active profile (used by the pool)"""
+        settings = PERFORMANCE_PROFILES[self.profile]
+        conn = sqlite3.connect(self.db_name, check_same_thread=False,
+                               timeout=settings['busy_timeout'] / 1000)
+        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+        # busy_timeout goes first so switching to WAL can wait out other writers
+        conn.execute(f"PRAGMA busy_timeout = {int(settings['busy_timeout'])}")
+        conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+        conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+        conn.execute(f"PRAGMA cache_size = {int(settings['cache_size'])}")
+        conn.execute(f"PRAGMA mmap_size = {int(settings['mmap_size'])}")
+        conn.execute(f"PRAGMA temp_store = {settings['temp_store']}")
+        return conn
+    
+    @_with_connection
+    def get_connection_settings(self) -> Dict:
+        """Read back the SQLite settings actually in effect on a pooled connection"""
+        def pragma(name):
+            # Some pragmas (mmap_size on :memory:) return no row at all
+            row = self.conn.execute(f"PRAGMA {name}").fetchone()
+            return row[0] if row else None
+        
+        synchronous = pragma('synchronous')
+        temp_store = pragma('temp_store')
+        return {
+            'profile': self.profile,
+            'journal_mode': pragma('journal_mode'),
+            'synchronous': SYNCHRONOUS_NAMES.get(synchronous, synchronous),
+            'cache_size': pragma('cache_size'),
+            'mmap_size': pragma('mmap_size'),
+            'temp_store': TEMP_STORE_NAMES.get(temp_store, temp_store),
+            'busy_timeout': pragma('busy_timeout'),
+        }
+    
+    def describe_settings(self) -> str:
+        """One-line summary of the active profile, for startup messages"""
+        settings = self.get_connection_settings()
+        details = ', '.join(f"{key}={value}" for key, value in settings.items() if key != 'profile')
+        return f"{self.db_name} [{settings['profile']}: {details}]"
+    
+    @contextmanager
+    def connection(self):
+        """
+        Check out a connection for the calling thread
+        
+        Nested use on the same thread reuses the connection already checked
+        out, so a caller can hold one connection across several method calls.
+        """
+        local = self._local
+        if getattr(local, 'conn', None) is not None:
+            local.depth += 1
+            try:
+                yield local.conn
+            finally:
+                local.depth -= 1
+            return
+        
+        with self.pool.connection() as conn:
+            local.conn = conn
+            local.depth = 1
+            try:
+                yield conn
+            finally:
+                local.conn = None
+                local.depth = 0
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group several CRUD calls into one transaction
+        
+        Methods called inside the block skip their own commit; the block
+        commits once on exit and rolls back if an exception escapes. Nested
+        blocks become savepoints, so an inner failure can be caught without
+        losing the outer work. The connection stays pinned to this thread
+        for the whole block.
+        """
+        with self.connection() as conn:
+            local = self._local
+            depth = getattr(local, 'tx_depth', 0)
+            savepoint = f"sp_{depth}"
+            conn.execute("BEGIN" if depth == 0 else f"SAVEPOINT {savepoint}")
+            local.tx_depth = depth + 1
+            if depth == 0:
+                local.pending_invalidations = []
+            try:
+                yield conn
+            except BaseException:
+                local.tx_depth = depth
+                if depth == 0:
+                    conn.rollback()
+                    self._flush_invalidations()
+                else:
+                    conn.execute(f"ROLLBACK TO {savepoint}")
+                    conn.execute(f"RELEASE {savepoint}")
+                raise
+            local.tx_depth = depth
+            if depth == 0:
+                try:
+                    conn.commit()
+                finally:
+                    self._flush_invalidations()
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+    
+    # Reads better in scripts that queue up many writes
+    batch = transaction
+    
+    @property
+    def in_transaction(self) -> bool:
+        """True inside a transaction()/batch() block on the calling thread"""
+        return getattr(self._local, 'tx_depth', 0) > 0
+    
+    def _commit(self):
+        """Commit unless an enclosing transaction() block will do it"""
+        if not self.in_transaction:
+            self.conn.commit()
     
-    def connect(self):
-        """Establish database connection"""
-        self.conn = sqlite3.connect(self.db_name)
-        self.conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-        return self.conn
+    def _rollback(self):
+        """Roll back unless an enclosing transaction() block owns the transaction"""
+        if not self.in_transaction:
+            self.conn.rollback()
+    
+    # ==================== ENTITY CACHE ====================
+    
+    def _cache_get(self, key) -> Optional[Dict]:
+        """Cached row for key, copied so callers cannot modify the cached dict"""
+        if self.cache is None:
+            return None
+        row = self.cache.get(key)
+        return dict(row) if row is not None else None
+    
+    def _cache_generation(self, kind: str):
+        """Take before reading a row to cache; pass to _cache_put() (see EntityCache)"""
+        return self.cache.generation(kind) if self.cache is not None else None
+    
+    def _cache_put(self, key, row: Optional[Dict], aliases=(), generation=None):
+        """
+        Cache a row that was read outside a transaction (misses are not cached)
+        
+        Nothing is cached if the row's kind was invalidated since generation
+        was taken: the row may predate a write committed meanwhile.
+        """
+        # Rows read inside a transaction may be rolled back, so never cache them
+        if self.cache is not None and row is not None and not self.in_transaction:
+            self.cache.put(key, dict(row), aliases, generation)
+    
+    def _invalidate(self, *keys, kinds=()):
+        """
+        Drop cache entries for rows that were just written
+        
+        Call after committing. Inside a transaction() block the same
+        invalidation is repeated when the block ends, so readers on other
+        threads cannot re-cache the old committed row in the meantime.
+        """
+        if self.cache is None:
+            return
+        for key in keys:
+            self.cache.invalidate(key)
+        for kind in kinds:
+            self.cache.invalidate_kind(kind)
+        if self.in_transaction:
+            self._local.pending_invalidations.append((keys, kinds))
+    
+    def _flush_invalidations(self):
+        pending = getattr(self._local, 'pending_invalidations', None)
+        self._local.pending_invalidations = []
+        if self.cache is None or not pending:
+            return
+        for keys, kinds in pending:
+            for key in keys:
+                self.cache.invalidate(key)
+            for kind in kinds:
+                self.cache.invalidate_kind(kind)
+    
+    def get_cache_stats(self) -> Optional[Dict]:
+        """Entity cache hit/miss/eviction counters, or None when caching is disabled"""
+        return self.cache.get_stats() if self.cache is not None else None
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection checked out by the calling thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            raise sqlite3.ProgrammingError(
+                "No connection checked out on this thread; use 'with db.connection():'"
+            )
+        return conn
+    
+    def get_pool_stats(self) -> Dict:
+        """Connection pool hit/miss and wait-time counters"""
+        return self.pool.get_stats()
     
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
+        """Close all pooled connections"""
+        self.pool.close()
     
     def create_tables(self):
-        """Create all tables from schema.sql"""
-        with open('schema.sql', 'r', encoding='utf-8') as f:
-            schema = f.read()
-        
-        # Remove comments and split by semicolons
-        lines = schema.split('\n')
-        cleaned_lines = []
-        for line in lines:
-            # Remove inline comments
-            if '--' in line:
-                line = line[:line.index('--')]
-            cleaned_lines.append(line)
-        
-        # Join and split by semicolons
-        cleaned_schema = '\n'.join(cleaned_lines)
-        statements = [s.strip() for s in cleaned_schema.split(';') if s.strip()]
+        """Create or upgrade all tables (see migrate)"""
+        self.migrate()
+    
+    @_with_connection
+    def get_schema_version(self) -> int:
+        """Schema version recorded in the database file"""
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    @_with_connection
+    def migrate(self) -> int:
+        """
+        Apply any migrations newer than the database's PRAGMA user_version
         
+        An up-to-date database costs a single pragma read. Each migration runs
+        in its own IMMEDIATE transaction together with the version bump, so
+        a failed migration leaves the database at the previous version and
+        two processes starting at once cannot apply the same migration twice.
+        Afterwards missing email keys are computed (see fill_email_keys()).
+        Returns the resulting schema version.
+        """
+        version = self.get_schema_version()
+        if version >= SCHEMA_VERSION:
+            return version
+        
+        for number in range(version + 1, SCHEMA_VERSION + 1):
+            name = MIGRATIONS[number - 1]
+            with open(os.path.join(MIGRATIONS_DIR, name), 'r', encoding='utf-8') as f:
+                statements = _split_sql(f.read())
+            
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Another process may have migrated while we waited for the lock
+                if self.get_schema_version() >= number:
+                    self.conn.rollback()
+                    continue
+                for statement in statements:
+                    self.conn.execute(statement)
+                self.conn.execute(f"PRAGMA user_version = {number}")
+                self.conn.commit()
+            except sqlite3.Error as e:
+                self.conn.rollback()
+                raise sqlite3.DatabaseError(f"Migration {name} failed: {e}") from e
+        self.email_provider_rules = self._stored_email_provider_rules()
+        self.fill_email_keys()
+        return SCHEMA_VERSION
+    
+    def _stored_email_provider_rules(self) -> bool:
+        """The email_provider_rules setting stored in the database"""
+        row = self.conn.execute("SELECT value FROM settings WHERE name = 'email_provider_rules'").fetchone()
+        return row is not None and row[0] == '1'
+    
+    def set_email_provider_rules(self, enabled: bool) -> Optional[Dict]:
+        """
+        Switch provider rules on or off for every process using the database
+        
+        Stores the setting and recomputes every email_key with it in one
+        transaction, merging subscriptions that now share a key as
+        dedupe_email_subscriptions() does. Other processes that already have
+        the database open pick the setting up when they reopen it. Returns
+        the dedupe report, or None if the setting did not change.
+        """
+        with self.transaction() as conn:
+            if self._stored_email_provider_rules() == enabled:
+                self.email_provider_rules = enabled
+                return None
+            conn.execute("UPDATE settings SET value = ? WHERE name = 'email_provider_rules'",
+                         ('1' if enabled else '0',))
+            self.email_provider_rules = enabled
+            try:
+                return self.dedupe_email_subscriptions()
+            except BaseException:
+                self.email_provider_rules = not enabled
+                raise
+    
+    @_with_connection
+    def fill_email_keys(self) -> int:
+        """
+        Compute the email key of subscriptions that have none
+        
+        The email_key triggers only fill in keys for ASCII addresses, so
+        rows other tools write with non-ASCII addresses get their key here,
+        from normalize_email like every key DatabaseManager writes. A row
+        whose key is already taken keeps a NULL key until
+        dedupe_email_subscriptions() merges it. Returns the number of keys
+        filled in.
+        """
         cursor = self.conn.cursor()
-        for statement in statements:
-            if statement:
-                try:
-                    cursor.execute(statement)
-                except sqlite3.OperationalError as e:
-                    error_msg = str(e).lower()
-                    # Ignore errors for existing tables/indexes and constraint violations
-                    if "already exists" not in error_msg and "constraint" not in error_msg:
-                        # Only print warnings for unexpected errors
-                        pass
-        self.conn.commit()
+        rows = cursor.execute(
+            "SELECT id, email FROM email_subscriptions WHERE email_key IS NULL ORDER BY subscribed_at, id"
+        ).fetchall()
+        filled = 0
+        for subscription_id, email in rows:
+            cursor.execute("UPDATE OR IGNORE email_subscriptions SET email_key = ? WHERE id = ?",
+                           (self.email_key(email), subscription_id))
+            filled += cursor.rowcount
+        self._commit()
+        if filled:
+            self._invalidate(kinds=('subscription',))
+        return filled
+    
+    @_with_connection
+    def seed_sample_data(self):
+        """Load the sample departments, employees and subscriptions from sample_data.sql"""
+        with open(SAMPLE_DATA_FILE, 'r', encoding='utf-8') as f:
+            statements = _split_sql(f.read())
+        try:
+            for statement in statements:
+                self.conn.execute(statement)
+            self._commit()
+        except sqlite3.Error:
+            self._rollback()
+            raise
+        self._invalidate(kinds=('department', 'employee', 'subscription'))
     
     # ==================== DEPARTMENT CRUD OPERATIONS ====================
     
+    @_with_connection
     def create_department(self, name: str, head_of_department_id: Optional[int] = None) -> int:
         """Create a new department"""
         cursor = self.conn.cursor()
@@ -71,22 +834,60 @@ class DatabaseManager:
             "INSERT INTO departments (name, head_of_department_id) VALUES (?, ?)",
             (name, head_of_department_id)
         )
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
     
     def get_department(self, department_id: int) -> Optional[Dict]:
         """Get department by ID"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM departments WHERE id = ?", (department_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        key = ('department', department_id)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        generation = self._cache_generation('department')
+        with self.connection() as conn:
+            row = conn.execute("SELECT * FROM departments WHERE id = ?", (department_id,)).fetchone()
+            department = dict(row) if row else None
+            self._cache_put(key, department, generation=generation)
+        return department
     
+    @_with_connection
     def get_all_departments(self) -> List[Dict]:
         """Get all departments"""
         cursor = self.conn.cursor()
         cursor.execute("SELECT * FROM departments ORDER BY name")
         return [dict(row) for row in cursor.fetchall()]
     
+    @_with_connection
+    def get_departments_with_heads(self) -> List[Dict]:
+        """
+        Get all departments with head_name, employee_count and supervisor_count
+        
+        One query: the head is joined by primary key and the counts come from
+        summary_counts, so the cost does not depend on the number of employees.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT d.*, h.name AS head_name,
+                   COALESCE(e.count, 0) AS employee_count,
+                   COALESCE(s.count, 0) AS supervisor_count
+            FROM departments d
+            LEFT JOIN employees h ON h.id = d.head_of_department_id
+            LEFT JOIN summary_counts e
+                ON e.scope = 'department_employees' AND e.key = CAST(d.id AS TEXT)
+            LEFT JOIN summary_counts s
+                ON s.scope = 'department_supervisors' AND s.key = CAST(d.id AS TEXT)
+            ORDER BY d.name
+        """)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @_with_connection
+    def get_employee_choices(self) -> List[Tuple[int, str]]:
+        """Get (id, name) of every employee, for pick lists"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT id, name FROM employees ORDER BY name")
+        return [tuple(row) for row in cursor.fetchall()]
+    
+    @_with_connection
     def update_department(self, department_id: int, name: Optional[str] = None, 
                          head_of_department_id: Optional[int] = None) -> bool:
         """Update department information"""
@@ -109,18 +910,23 @@ class DatabaseManager:
             f"UPDATE departments SET {', '.join(updates)} WHERE id = ?",
             params
         )
-        self.conn.commit()
+        self._commit()
+        self._invalidate(('department', department_id))
         return cursor.rowcount > 0
     
+    @_with_connection
     def delete_department(self, department_id: int) -> bool:
         """Delete a department (cascades to employees)"""
         cursor = self.conn.cursor()
         cursor.execute("DELETE FROM departments WHERE id = ?", (department_id,))
-        self.conn.commit()
+        self._commit()
+        # Employees may have been removed by the cascade
+        self._invalidate(('department', department_id), kinds=('employee',))
         return cursor.rowcount > 0
     
     # ==================== EMPLOYEE CRUD OPERATIONS ====================
     
+    @_with_connection
     def create_employee(self, name: str, email: str, department_id: int, 
                        is_supervisor: bool = False, is_head: bool = False,
                        position: Optional[str] = None, hire_date: Optional[str] = None) -> int:
@@ -131,16 +937,23 @@ class DatabaseManager:
                is_head, position, hire_date) VALUES (?, ?, ?, ?, ?, ?, ?)""",
             (name, email, department_id, is_supervisor, is_head, position, hire_date)
         )
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
     
     def get_employee(self, employee_id: int) -> Optional[Dict]:
         """Get employee by ID"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM employees WHERE id = ?", (employee_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        key = ('employee', employee_id)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        generation = self._cache_generation('employee')
+        with self.connection() as conn:
+            row = conn.execute("SELECT * FROM employees WHERE id = ?", (employee_id,)).fetchone()
+            employee = dict(row) if row else None
+            self._cache_put(key, employee, generation=generation)
+        return employee
     
+    @_with_connection
     def get_all_employees(self) -> List[Dict]:
         """Get all employees"""
         cursor = self.conn.cursor()
@@ -152,6 +965,7 @@ class DatabaseManager:
         """)
         return [dict(row) for row in cursor.fetchall()]
     
+    @_with_connection
     def get_employees_by_department(self, department_id: int) -> List[Dict]:
         """Get all employees in a specific department"""
         cursor = self.conn.cursor()
@@ -164,6 +978,7 @@ class DatabaseManager:
         """, (department_id,))
         return [dict(row) for row in cursor.fetchall()]
     
+    @_with_connection
     def get_supervisors_by_department(self, department_id: int) -> List[Dict]:
         """Get all supervisors in a specific department"""
         cursor = self.conn.cursor()
@@ -176,6 +991,7 @@ class DatabaseManager:
         """, (department_id,))
         return [dict(row) for row in cursor.fetchall()]
     
+    @_with_connection
     def update_employee(self, employee_id: int, name: Optional[str] = None,
                         email: Optional[str] = None, department_id: Optional[int] = None,
                         is_supervisor: Optional[bool] = None, is_head: Optional[bool] = None,
@@ -215,66 +1031,170 @@ class DatabaseManager:
             f"UPDATE employees SET {', '.join(updates)} WHERE id = ?",
             params
         )
-        self.conn.commit()
+        self._commit()
+        self._invalidate(('employee', employee_id))
         return cursor.rowcount > 0
     
+    @_with_connection
     def delete_employee(self, employee_id: int) -> bool:
         """Delete an employee"""
         cursor = self.conn.cursor()
         cursor.execute("DELETE FROM employees WHERE id = ?", (employee_id,))
-        self.conn.commit()
+        self._commit()
+        self._invalidate(('employee', employee_id))
         return cursor.rowcount > 0
     
     # ==================== EMAIL SUBSCRIPTION CRUD OPERATIONS ====================
     
+    def email_key(self, email: str) -> str:
+        """Normalized address used by the unique email_key index"""
+        return normalize_email(email, self.email_provider_rules)
+    
+    @_with_connection
     def create_email_subscription(self, email: str, status: str = 'active',
                                   source: Optional[str] = None, notes: Optional[str] = None) -> int:
-        """Create a new email subscription"""
+        """Create a new email subscription (IntegrityError if the normalized email exists)"""
         cursor = self.conn.cursor()
+        cursor.execute(NEXT_CHANGE_SEQ_SQL)
         cursor.execute(
-            """INSERT INTO email_subscriptions (email, status, source, notes) 
-               VALUES (?, ?, ?, ?)""",
-            (email, status, source, notes)
+            f"""INSERT INTO email_subscriptions (email, email_key, status, source, notes, updated_at, change_seq)
+                VALUES (?, ?, ?, ?, ?, {CHANGE_TIMESTAMP_SQL}, {CHANGE_SEQ_SQL})""",
+            (email, self.email_key(email), status, source, notes)
         )
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
     
+    def _cache_subscription(self, subscription: Optional[Dict], generation=None):
+        """Cache a subscription under its id, reachable by normalized email as well"""
+        if subscription is not None:
+            key = subscription.get('email_key')
+            aliases = [('subscription_email', key)] if key is not None else []
+            self._cache_put(('subscription', subscription['id']), subscription, aliases=aliases,
+                            generation=generation)
+    
     def get_email_subscription(self, subscription_id: int) -> Optional[Dict]:
         """Get email subscription by ID"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM email_subscriptions WHERE id = ?", (subscription_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        cached = self._cache_get(('subscription', subscription_id))
+        if cached is not None:
+            return cached
+        generation = self._cache_generation('subscription')
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM email_subscriptions WHERE id = ?", (subscription_id,)
+            ).fetchone()
+            subscription = dict(row) if row else None
+            self._cache_subscription(subscription, generation)
+        return subscription
     
     def get_email_subscription_by_email(self, email: str) -> Optional[Dict]:
-        """Get email subscription by email address"""
+        """Get email subscription by email address, matched on the normalized key"""
+        key = self.email_key(email)
+        cached = self._cache_get(('subscription_email', key))
+        if cached is not None:
+            return cached
+        generation = self._cache_generation('subscription')
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM email_subscriptions WHERE email_key = ?", (key,)
+            ).fetchone()
+            subscription = dict(row) if row else None
+            self._cache_subscription(subscription, generation)
+        return subscription
+    
+    @_with_connection
+    def get_all_email_subscriptions(self, status: Optional[str] = None,
+                                    domain: Optional[str] = None) -> List[Dict]:
+        """Get all email subscriptions, optionally filtered by status and email domain"""
+        conditions, params = self._subscription_filter(status=status, domain=domain)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT * FROM email_subscriptions WHERE email = ?", (email,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        cursor.execute(
+            f"SELECT * FROM email_subscriptions {where} ORDER BY subscribed_at DESC",
+            params
+        )
+        return [dict(row) for row in cursor.fetchall()]
     
-    def get_all_email_subscriptions(self, status: Optional[str] = None) -> List[Dict]:
-        """Get all email subscriptions, optionally filtered by status"""
+    @_with_connection
+    def get_email_subscriptions_page(self, after: Optional[Tuple] = None, limit: int = 100,
+                                     status: Optional[str] = None,
+                                     sort_by: str = 'subscribed_at',
+                                     descending: bool = True,
+                                     domain: Optional[str] = None) -> List[Dict]:
+        """
+        Get one page of email subscriptions using keyset pagination
+        
+        after is the (sort value, id) pair of the last row of the previous
+        page, or None for the first page. Unlike OFFSET paging, each page is
+        an index range scan no matter how deep into the list it is.
+        """
+        if sort_by not in EMAIL_SORT_COLUMNS:
+            raise ValueError(f"Cannot sort email subscriptions by '{sort_by}'")
+        sort_expr = EMAIL_SORT_COLUMNS[sort_by]
+        direction = "DESC" if descending else "ASC"
+        
+        conditions, params = self._subscription_filter(status=status, domain=domain)
+        if after is not None:
+            value, last_id = after
+            value = value if value is not None else ''
+            operator = '<' if descending else '>'
+            # The plain bound is what SQLite turns into an index range for
+            # expression sorts such as source; the row value breaks ties on id
+            conditions.append(f"{sort_expr} {operator}= ? AND ({sort_expr}, id) {operator} (?, ?)")
+            params.extend([value, value, last_id])
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"""SELECT * FROM email_subscriptions {where}
+                ORDER BY {sort_expr} {direction}, id {direction} LIMIT ?""",
+            params
+        )
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @_with_connection
+    def count_email_subscriptions(self, status: Optional[str] = None,
+                                  domain: Optional[str] = None) -> int:
+        """
+        Count email subscriptions, optionally filtered by status and domain
+        
+        Status-only counts are read from summary_counts; domain counts come
+        from the domain index.
+        """
         cursor = self.conn.cursor()
+        if domain:
+            conditions, params = self._subscription_filter(status=status, domain=domain)
+            cursor.execute(
+                f"SELECT COUNT(*) FROM email_subscriptions WHERE {' AND '.join(conditions)}",
+                params
+            )
+            return cursor.fetchone()[0]
         if status:
             cursor.execute(
-                "SELECT * FROM email_subscriptions WHERE status = ? ORDER BY subscribed_at DESC",
+                "SELECT count FROM summary_counts WHERE scope = 'subscription_status' AND key = ?",
                 (status,)
             )
-        else:
-            cursor.execute("SELECT * FROM email_subscriptions ORDER BY subscribed_at DESC")
-        return [dict(row) for row in cursor.fetchall()]
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        cursor.execute("SELECT COALESCE(SUM(count), 0) FROM summary_counts WHERE scope = 'subscription_status'")
+        return cursor.fetchone()[0]
     
     def update_email_subscription(self, subscription_id: int, email: Optional[str] = None,
                                   status: Optional[str] = None, source: Optional[str] = None,
                                   notes: Optional[str] = None) -> bool:
-        """Update email subscription information"""
+        """
+        Update email subscription information
+        
+        Runs as a transaction() block (a savepoint inside another block), so
+        a failed update, such as an email whose key is taken, leaves the row
+        as it was even when the caller catches the IntegrityError.
+        """
         updates = []
         params = []
         
         if email is not None:
-            updates.append("email = ?")
-            params.append(email)
+            updates.append("email = ?, email_key = ?")
+            params.extend([email, self.email_key(email)])
         if status is not None:
             updates.append("status = ?")
             params.append(status)
@@ -288,120 +1208,1218 @@ class DatabaseManager:
         if not updates:
             return False
         
+        updates.append(f"updated_at = {CHANGE_TIMESTAMP_SQL}, change_seq = {CHANGE_SEQ_SQL}")
         params.append(subscription_id)
-        cursor = self.conn.cursor()
-        cursor.execute(
-            f"UPDATE email_subscriptions SET {', '.join(updates)} WHERE id = ?",
-            params
-        )
-        self.conn.commit()
+        with self.transaction() as conn:
+            conn.execute(NEXT_CHANGE_SEQ_SQL)
+            if email is not None:
+                # Clear the key first, so the email_key update trigger sees a
+                # key that changed and leaves the one written below alone even
+                # when it equals the old key (a provider alias)
+                conn.execute("UPDATE email_subscriptions SET email_key = NULL WHERE id = ?",
+                             (subscription_id,))
+            cursor = conn.execute(
+                f"UPDATE email_subscriptions SET {', '.join(updates)} WHERE id = ?",
+                params
+            )
+        # Also drops the entry cached under the old email address
+        self._invalidate(('subscription', subscription_id))
         return cursor.rowcount > 0
     
+    @_with_connection
     def delete_email_subscription(self, subscription_id: int) -> bool:
         """Delete an email subscription"""
         cursor = self.conn.cursor()
         cursor.execute("DELETE FROM email_subscriptions WHERE id = ?", (subscription_id,))
-        self.conn.commit()
+        self._commit()
+        self._invalidate(('subscription', subscription_id))
         return cursor.rowcount > 0
     
+    # ==================== FULL-TEXT SEARCH ====================
+    
+    @_with_connection
+    def search_subscriptions(self, query: str, limit: int = SEARCH_LIMIT,
+                             status: Optional[str] = None) -> List[Dict]:
+        """
+        Prefix search over subscription email, source and notes
+        
+        Uses the subscriptions_fts index, newest subscriptions first. Results
+        are walked in FTS rowid order rather than ranked, so a short prefix
+        matching most of the table still stops after limit rows.
+        """
+        match = _fts_query(query)
+        if match is None:
+            return []
+        params = [match]
+        status_filter = ""
+        if status:
+            status_filter = "AND s.status = ?"
+            params.append(status)
+        params.append(limit)
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT s.*
+            FROM subscriptions_fts f
+            JOIN email_subscriptions s ON s.id = f.rowid
+            WHERE subscriptions_fts MATCH ? {status_filter}
+            ORDER BY f.rowid DESC
+            LIMIT ?
+        """, params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @_with_connection
+    def search_employees(self, query: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+        """Prefix search over employee name, email and position, best matches first"""
+        match = _fts_query(query)
+        if match is None:
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT e.*, d.name as department_name
+            FROM employees_fts f
+            JOIN employees e ON e.id = f.rowid
+            LEFT JOIN departments d ON e.department_id = d.id
+            WHERE employees_fts MATCH ?
+            ORDER BY f.rank
+            LIMIT ?
+        """, (match, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @_with_connection
+    def rebuild_search_index(self):
+        """Rebuild both full-text indexes from their base tables"""
+        cursor = self.conn.cursor()
+        cursor.execute("INSERT INTO subscriptions_fts (subscriptions_fts) VALUES ('rebuild')")
+        cursor.execute("INSERT INTO employees_fts (employees_fts) VALUES ('rebuild')")
+        self._commit()
+    
+    # ==================== STATISTICS ====================
+    
+    @_with_connection
+    def get_summary_counts(self, scope: str) -> Dict[str, int]:
+        """
+        Trigger-maintained counts for one scope of the summary_counts table
+        
+        Scopes: subscription_status, subscription_source (None sources
+        appear as ''), department_employees, department_supervisors and
+        department_heads (keyed by department id as text).
+        """
+        cursor = self.conn.execute(
+            "SELECT key, count FROM summary_counts WHERE scope = ? ORDER BY key", (scope,)
+        )
+        return {row['key']: row['count'] for row in cursor}
+    
+    def rebuild_summary_counts(self):
+        """Recompute summary_counts from the base tables to repair any drift"""
+        with self.transaction() as conn:
+            for statement in SUMMARY_COUNTS_REBUILD_SQL:
+                conn.execute(statement)
+    
+    @_with_connection
+    def get_domain_breakdown(self, status: Optional[str] = None,
+                             top_n: Optional[int] = DOMAIN_BREAKDOWN_TOP_N) -> List[Dict]:
+        """
+        Subscriptions per email domain, largest first
+        
+        Answered from the (domain, status) / (status, domain) indexes without
+        reading the table. Pass top_n=None for every domain; emails without
+        an '@' are not counted.
+        """
+        params = []
+        status_filter = ""
+        if status:
+            status_filter = "AND status = ?"
+            params.append(status)
+        limit = ""
+        if top_n is not None:
+            limit = "LIMIT ?"
+            params.append(top_n)
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT domain, COUNT(*) as count
+            FROM email_subscriptions
+            WHERE domain IS NOT NULL {status_filter}
+            GROUP BY domain
+            ORDER BY count DESC, domain
+            {limit}
+        """, params)
+        return [dict(row) for row in cursor.fetchall()]
+    
+    def get_statistics(self) -> Dict:
+        """
+        Summary counts for dashboards
+        
+        Returns totals for departments, employees, supervisors, heads and
+        subscriptions, subscription counts per status and per source, and
+        per-department employee/supervisor counts. Counts come from the
+        trigger-maintained summary_counts table, so the cost does not grow
+        with the number of employees or subscriptions. The queries share one
+        read transaction so the numbers are consistent with each other.
+        """
+        with self.transaction() as conn:
+            counts = {}
+            for row in conn.execute("SELECT scope, key, count FROM summary_counts"):
+                counts.setdefault(row['scope'], {})[row['key']] = row['count']
+            
+            departments = [dict(row) for row in conn.execute("""
+                SELECT d.id, d.name,
+                       COALESCE(e.count, 0) AS employee_count,
+                       COALESCE(s.count, 0) AS supervisor_count
+                FROM departments d
+                LEFT JOIN summary_counts e
+                    ON e.scope = 'department_employees' AND e.key = CAST(d.id AS TEXT)
+                LEFT JOIN summary_counts s
+                    ON s.scope = 'department_supervisors' AND s.key = CAST(d.id AS TEXT)
+                ORDER BY d.name
+            """)]
+        
+        status_counts = counts.get('subscription_status', {})
+        by_status = {status: status_counts.get(status, 0) for status in EMAIL_STATUSES}
+        return {
+            'total_departments': len(departments),
+            'total_employees': sum(counts.get('department_employees', {}).values()),
+            'total_supervisors': sum(counts.get('department_supervisors', {}).values()),
+            'total_heads': sum(counts.get('department_heads', {}).values()),
+            'total_subscriptions': sum(status_counts.values()),
+            'subscriptions_by_status': by_status,
+            'subscriptions_by_source': {
+                source or None: count
+                for source, count in counts.get('subscription_source', {}).items() if count
+            },
+            'departments': departments,
+        }
+    
+    # ==================== BULK EMAIL SUBSCRIPTION OPERATIONS ====================
+    
+    @staticmethod
+    def _subscription_filter(status: Optional[str] = None, source: Optional[str] = None,
+                             subscribed_after: Optional[str] = None,
+                             subscribed_before: Optional[str] = None,
+                             domain: Optional[str] = None) -> Tuple[List[str], List]:
+        """Build WHERE conditions and parameters for the subscription filters"""
+        conditions = []
+        params = []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if domain:
+            # Stored domains are lowercased; accept "@Gmail.com" as well
+            conditions.append("domain = ?")
+            params.append(domain.strip().lstrip('@').lower())
+        if source:
+            conditions.append("source = ?")
+            params.append(source)
+        if subscribed_after:
+            conditions.append("subscribed_at >= ?")
+            params.append(subscribed_after)
+        if subscribed_before:
+            conditions.append("subscribed_at < ?")
+            params.append(subscribed_before)
+        return conditions, params
+    
+    def _bulk_modify_subscriptions(self, statement: str, statement_params: List,
+                                   ids: Optional[Iterable[int]], filters: Dict,
+                                   skip_condition: Optional[Tuple[str, List]] = None) -> int:
+        """
+        Run an UPDATE/DELETE on email_subscriptions for an id set or a filter
+        
+        Id sets are bound in chunks of BULK_ID_CHUNK_SIZE. skip_condition is
+        an extra (condition, params) that rows must also meet, for leaving
+        out rows the statement would not change. Everything runs in one
+        transaction and the total number of affected rows is returned.
+        """
+        conditions, params = self._subscription_filter(**filters)
+        if ids is None and not conditions:
+            raise ValueError("Refusing to modify every subscription: pass ids or a filter")
+        if skip_condition is not None:
+            conditions.append(skip_condition[0])
+            params.extend(skip_condition[1])
+        
+        affected = 0
+        with self.transaction() as conn:
+            self._invalidate(kinds=('subscription',))
+            # One change number for the whole operation; it commits as a unit
+            conn.execute(NEXT_CHANGE_SEQ_SQL)
+            if ids is None:
+                cursor = conn.execute(
+                    f"{statement} WHERE {' AND '.join(conditions)}",
+                    statement_params + params
+                )
+                return cursor.rowcount
+            for chunk in _chunks(ids, BULK_ID_CHUNK_SIZE):
+                where = conditions + [f"id IN ({', '.join('?' * len(chunk))})"]
+                cursor = conn.execute(
+                    f"{statement} WHERE {' AND '.join(where)}",
+                    statement_params + params + chunk
+                )
+                affected += cursor.rowcount
+        return affected
+    
+    def bulk_create_email_subscriptions(self, subscriptions: Iterable[Dict],
+                                        skip_duplicates: bool = True,
+                                        batch_size: int = IMPORT_BATCH_SIZE) -> int:
+        """
+        Create many email subscriptions in one transaction
+        
+        Each item is a dict with 'email' and optional 'status', 'source' and
+        'notes'. Emails whose normalized key already exists are skipped when
+        skip_duplicates is True, otherwise the first duplicate raises and
+        nothing is inserted. Only duplicates are skipped: a missing email or
+        a status not in EMAIL_STATUSES raises ValueError and nothing is
+        inserted. Returns the number of subscriptions created.
+        """
+        on_conflict = "ON CONFLICT(email_key) DO NOTHING" if skip_duplicates else ""
+        
+        def row(item):
+            email = item.get('email')
+            status = item.get('status') or 'active'
+            if not email or not email.strip():
+                raise ValueError("Every subscription needs an email")
+            if status not in EMAIL_STATUSES:
+                raise ValueError(f"Invalid status '{status}' for {email}")
+            return (email, self.email_key(email), status, item.get('source'), item.get('notes'))
+        
+        created = 0
+        with self.transaction() as conn:
+            conn.execute(NEXT_CHANGE_SEQ_SQL)
+            for chunk in _chunks(map(row, subscriptions), batch_size):
+                cursor = conn.executemany(
+                    f"""INSERT INTO email_subscriptions (email, email_key, status, source, notes, updated_at, change_seq)
+                        VALUES (?, ?, ?, ?, ?, {CHANGE_TIMESTAMP_SQL}, {CHANGE_SEQ_SQL})
+                        {on_conflict}""",
+                    chunk
+                )
+                created += cursor.rowcount
+        return created
+    
+    def bulk_update_email_status(self, new_status: str, ids: Optional[Iterable[int]] = None,
+                                 status: Optional[str] = None, source: Optional[str] = None,
+                                 subscribed_after: Optional[str] = None,
+                                 subscribed_before: Optional[str] = None,
+                                 domain: Optional[str] = None) -> int:
+        """
+        Set the status of many subscriptions at once
+        
+        Select them by ids, by a filter (current status, source, email domain,
+        subscribed_at range with an inclusive start and exclusive end), or both.
+        Subscriptions that already have new_status are left alone, so they
+        do not show up as changed in the next delta export. Returns the
+        number of subscriptions updated.
+        """
+        if new_status not in EMAIL_STATUSES:
+            raise ValueError(f"Invalid status '{new_status}'")
+        return self._bulk_modify_subscriptions(
+            f"UPDATE email_subscriptions SET status = ?, updated_at = {CHANGE_TIMESTAMP_SQL}, change_seq = {CHANGE_SEQ_SQL}",
+            [new_status], ids,
+            dict(status=status, source=source, subscribed_after=subscribed_after,
+                 subscribed_before=subscribed_before, domain=domain),
+            skip_condition=("status IS NOT ?", [new_status])
+        )
+    
+    def bulk_delete_email_subscriptions(self, ids: Optional[Iterable[int]] = None,
+                                        status: Optional[str] = None, source: Optional[str] = None,
+                                        subscribed_after: Optional[str] = None,
+                                        subscribed_before: Optional[str] = None,
+                                        domain: Optional[str] = None) -> int:
+        """
+        Delete many subscriptions at once, selected by ids and/or a filter
+        Returns the number of subscriptions deleted.
+        """
+        return self._bulk_modify_subscriptions(
+            "DELETE FROM email_subscriptions", [], ids,
+            dict(status=status, source=source, subscribed_after=subscribed_after,
+                 subscribed_before=subscribed_before, domain=domain)
+        )
+    
+    # ==================== DEDUPLICATION ====================
+    
+    def dedupe_email_subscriptions(self) -> Dict:
+        """
+        Merge subscriptions whose emails normalize to the same key
+        
+        Keys are recomputed for every row with the current provider rules,
+        all in set-based statements inside one transaction. In each group the
+        row with the earliest subscribed_at is kept; it takes the strongest
+        status of the group (unsubscribed, then bounced, then active) so
+        nobody who opted out is mailed again, and fills a missing source or
+        notes from the duplicates. The other rows are deleted.
+        
+        Returns a report with the number of groups merged, rows removed and
+        one entry per group: kept_id, kept_email and merged_emails.
+        """
+        with self.transaction() as conn:
+            conn.create_function('normalize_email_key', 1, self.email_key, deterministic=True)
+            conn.execute("DROP TABLE IF EXISTS temp.email_dedupe")
+            conn.execute("""
+                CREATE TEMP TABLE email_dedupe (
+                    id INTEGER PRIMARY KEY,
+                    email_key TEXT NOT NULL,
+                    keep_id INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                INSERT INTO email_dedupe (id, email_key, keep_id)
+                SELECT id, email_key,
+                       FIRST_VALUE(id) OVER (PARTITION BY email_key ORDER BY subscribed_at, id)
+                FROM (SELECT id, subscribed_at, normalize_email_key(email) AS email_key
+                      FROM email_subscriptions)
+            """)
+            conn.execute("CREATE INDEX temp.idx_email_dedupe_keep ON email_dedupe(keep_id)")
+            
+            merges = [
+                {'kept_id': row['kept_id'], 'kept_email': row['kept_email'],
+                 'merged_emails': json.loads(row['merged_emails'])}
+                for row in conn.execute("""
+                    SELECT d.keep_id AS kept_id, k.email AS kept_email,
+                           json_group_array(s.email) AS merged_emails
+                    FROM email_dedupe d
+                    JOIN email_subscriptions s ON s.id = d.id
+                    JOIN email_subscriptions k ON k.id = d.keep_id
+                    WHERE d.id != d.keep_id
+                    GROUP BY d.keep_id
+                    ORDER BY d.keep_id
+                """)
+            ]
+            
+            conn.execute("""
+                UPDATE email_subscriptions
+                SET status = merged.status,
+                    source = COALESCE(email_subscriptions.source, merged.source),
+                    notes = COALESCE(email_subscriptions.notes, merged.notes)
+                FROM (
+                    SELECT d.keep_id,
+                           CASE MAX(CASE s.status WHEN 'unsubscribed' THEN 2
+                                                  WHEN 'bounced' THEN 1 ELSE 0 END)
+                               WHEN 2 THEN 'unsubscribed' WHEN 1 THEN 'bounced' ELSE 'active'
+                           END AS status,
+                           MAX(s.source) AS source,
+                           MAX(s.notes) AS notes
+                    FROM email_dedupe d
+                    JOIN email_subscriptions s ON s.id = d.id
+                    WHERE d.keep_id IN (SELECT keep_id FROM email_dedupe WHERE id != keep_id)
+                    GROUP BY d.keep_id
+                ) AS merged
+                WHERE email_subscriptions.id = merged.keep_id
+            """)
+            removed = conn.execute(
+                "DELETE FROM email_subscriptions WHERE id IN "
+                "(SELECT id FROM email_dedupe WHERE id != keep_id)"
+            ).rowcount
+            
+            # Clear changed keys before setting them, since the unique index is
+            # checked row by row and two rows may be swapping keys
+            conn.execute("""
+                UPDATE email_subscriptions SET email_key = NULL
+                FROM email_dedupe d
+                WHERE d.id = email_subscriptions.id AND email_subscriptions.email_key IS NOT d.email_key
+            """)
+            conn.execute("""
+                UPDATE email_subscriptions SET email_key = d.email_key
+                FROM email_dedupe d
+                WHERE d.id = email_subscriptions.id AND email_subscriptions.email_key IS NULL
+            """)
+            conn.execute("DROP TABLE temp.email_dedupe")
+            self._invalidate(kinds=('subscription',))
+        
+        return {'groups': len(merges), 'removed': removed, 'merges': merges}
+    
     # ==================== CSV EXPORT/IMPORT OPERATIONS ====================
     
-    def export_emails_to_csv(self, filename: str, status: Optional[str] = None) -> bool:
-        """Export email subscriptions to CSV file"""
+    def _iter_query_chunks(self, sql: str, params: Iterable = (),
+                           chunk_size: int = EXPORT_CHUNK_SIZE):
+        """
+        Yield the column names of a query, then lists of rows fetched from
+        the cursor chunk_size at a time
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            yield [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+    
+    def _iter_email_subscription_chunks(self, status: Optional[str] = None,
+                                        domain: Optional[str] = None,
+                                        chunk_size: int = EXPORT_CHUNK_SIZE):
+        """_iter_query_chunks() over the subscriptions matching status and domain"""
+        conditions, params = self._subscription_filter(status=status, domain=domain)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._iter_query_chunks(
+            f"""SELECT {', '.join(SUBSCRIPTION_EXPORT_COLUMNS)} FROM email_subscriptions {where}
+                ORDER BY subscribed_at DESC""",
+            params, chunk_size
+        )
+    
+    @staticmethod
+    def _write_csv_export(filename: str, chunks, total: int,
+                          progress: Optional[ProgressCallback] = None,
+                          compression: Optional[str] = None,
+                          compression_level: Optional[int] = None):
+        """Write the header and row chunks from _iter_query_chunks() to a CSV file"""
+        with _open_export_file(filename, compression, compression_level) as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(next(chunks))
+            written = 0
+            for rows in chunks:
+                writer.writerows(rows)
+                written += len(rows)
+                if progress:
+                    progress(written, written / total if total else None)
+    
+    @staticmethod
+    def _write_jsonl_export(filename: str, chunks, total: int,
+                            progress: Optional[ProgressCallback] = None,
+                            compression: Optional[str] = None,
+                            compression_level: Optional[int] = None):
+        """Write the row chunks from _iter_query_chunks() as JSON Lines, one object per row"""
+        encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        with _open_export_file(filename, compression, compression_level) as jsonfile:
+            headers = next(chunks)
+            written = 0
+            for rows in chunks:
+                jsonfile.write(''.join(encode(dict(zip(headers, row))) + '\n' for row in rows))
+                written += len(rows)
+                if progress:
+                    progress(written, written / total if total else None)
+    
+    @staticmethod
+    def _write_excel_export(filename: str, chunks, total: int,
+                            progress: Optional[ProgressCallback] = None):
+        """
+        Write the header and row chunks from _iter_query_chunks() to an .xlsx file
+        
+        Uses a write-only workbook, so rows are streamed to disk instead of
+        being held as cell objects. A new sheet is started whenever the
+        current one reaches Excel's row limit. Raises ImportError without
+        openpyxl.
+        """
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill
+        
+        headers = next(chunks)
+        wb = openpyxl.Workbook(write_only=True)
+        header_font = Font(bold=True, color="FFFFFF")
+        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+        
+        def new_sheet():
+            number = len(wb.worksheets) + 1
+            title = "Email Subscriptions" if number == 1 else f"Email Subscriptions ({number})"
+            sheet = wb.create_sheet(title)
+            header_row = []
+            for header in headers:
+                cell = WriteOnlyCell(sheet, value=header)
+                cell.font = header_font
+                cell.fill = header_fill
+                header_row.append(cell)
+            sheet.append(header_row)
+            return sheet
+        
+        ws = new_sheet()
+        rows_in_sheet = 1
+        written = 0
+        for rows in chunks:
+            for row in rows:
+                if rows_in_sheet >= EXCEL_MAX_ROWS:
+                    ws = new_sheet()
+                    rows_in_sheet = 1
+                ws.append(tuple(row))
+                rows_in_sheet += 1
+            written += len(rows)
+            if progress:
+                progress(written, written / total if total else None)
+        
+        wb.save(filename)
+    
+    @_with_connection
+    def export_emails_to_csv(self, filename: str, status: Optional[str] = None,
+                             progress: Optional[ProgressCallback] = None,
+                             domain: Optional[str] = None,
+                             compression: Optional[str] = None,
+                             compression_level: Optional[int] = None) -> bool:
+        """
+        Export email subscriptions to CSV file
+        
+        Rows are streamed from the cursor in fixed-size chunks, so memory use
+        does not depend on the size of the table. compression is 'gzip',
+        'bz2' or 'xz' (inferred from a .gz/.bz2/.xz filename if not given)
+        and the rows are then compressed as they are written, at
+        compression_level or the codec's EXPORT_COMPRESSION_LEVELS default.
+        If progress raises OperationCancelled the partial file is removed
+        and the exception propagates.
+        """
+        compression = _export_compression(filename, compression, compression_level)
         try:
-            subscriptions = self.get_all_email_subscriptions(status)
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                if subscriptions:
-                    fieldnames = subscriptions[0].keys()
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(subscriptions)
-                else:
-                    # Create empty CSV with headers
-                    writer = csv.DictWriter(csvfile, fieldnames=['id', 'email', 'subscribed_at', 'status', 'source', 'notes'])
-                    writer.writeheader()
+            total = self.count_email_subscriptions(status, domain) if progress else 0
+            with closing(self._iter_email_subscription_chunks(status, domain)) as chunks:
+                self._write_csv_export(filename, chunks, total, progress, compression, compression_level)
             return True
+        except OperationCancelled:
+            if os.path.exists(filename):
+                os.remove(filename)
+            raise
         except Exception as e:
             print(f"Error exporting to CSV: {e}")
             return False
     
-    def export_emails_to_excel(self, filename: str, status: Optional[str] = None) -> bool:
-        """Export email subscriptions to Excel file (requires openpyxl)"""
+    @_with_connection
+    def export_emails_to_jsonl(self, filename: str, status: Optional[str] = None,
+                               progress: Optional[ProgressCallback] = None,
+                               domain: Optional[str] = None,
+                               compression: Optional[str] = None,
+                               compression_level: Optional[int] = None) -> bool:
+        """
+        Export email subscriptions to a JSON Lines file, one object per subscription
+        
+        Streams and compresses like export_emails_to_csv().
+        """
+        compression = _export_compression(filename, compression, compression_level)
         try:
-            import openpyxl
-            from openpyxl.styles import Font, PatternFill
-            
-            subscriptions = self.get_all_email_subscriptions(status)
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "Email Subscriptions"
-            
-            if subscriptions:
-                # Write headers
-                headers = list(subscriptions[0].keys())
-                for col, header in enumerate(headers, 1):
-                    cell = ws.cell(row=1, column=col, value=header)
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                    cell.font = Font(bold=True, color="FFFFFF")
-                
-                # Write data
-                for row, subscription in enumerate(subscriptions, 2):
-                    for col, header in enumerate(headers, 1):
-                        ws.cell(row=row, column=col, value=subscription.get(header, ''))
-            else:
-                # Create empty Excel with headers
-                headers = ['id', 'email', 'subscribed_at', 'status', 'source', 'notes']
-                for col, header in enumerate(headers, 1):
-                    cell = ws.cell(row=1, column=col, value=header)
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-                    cell.font = Font(bold=True, color="FFFFFF")
-            
-            wb.save(filename)
+            total = self.count_email_subscriptions(status, domain) if progress else 0
+            with closing(self._iter_email_subscription_chunks(status, domain)) as chunks:
+                self._write_jsonl_export(filename, chunks, total, progress, compression, compression_level)
+            return True
+        except OperationCancelled:
+            if os.path.exists(filename):
+                os.remove(filename)
+            raise
+        except Exception as e:
+            print(f"Error exporting to JSON Lines: {e}")
+            return False
+    
+    @_with_connection
+    def export_emails_to_excel(self, filename: str, status: Optional[str] = None,
+                               progress: Optional[ProgressCallback] = None,
+                               domain: Optional[str] = None) -> bool:
+        """
+        Export email subscriptions to Excel file (requires openpyxl)
+        
+        Rows are streamed from a chunked cursor into a write-only workbook,
+        with a new sheet whenever one reaches Excel's row limit. If progress
+        raises OperationCancelled nothing is saved.
+        """
+        try:
+            total = self.count_email_subscriptions(status, domain) if progress else 0
+            with closing(self._iter_email_subscription_chunks(status, domain)) as chunks:
+                self._write_excel_export(filename, chunks, total, progress)
             return True
         except ImportError:
             print("openpyxl not installed. Install it with: pip install openpyxl")
             return False
+        except OperationCancelled:
+            raise
         except Exception as e:
             print(f"Error exporting to Excel: {e}")
             return False
     
-    def import_emails_from_csv(self, filename: str, skip_duplicates: bool = True) -> Tuple[int, int]:
+    def export_emails_sharded(self, prefix: str, fmt: str = 'csv', compression: Optional[str] = 'gzip',
+                              compression_level: Optional[int] = None,
+                              workers: Optional[int] = None, shards: Optional[int] = None,
+                              status: Optional[str] = None, domain: Optional[str] = None,
+                              progress: Optional[ProgressCallback] = None) -> Optional[Dict]:
+        """
+        Export email subscriptions in parallel into shard files plus a manifest
+        
+        The id range of the table is split into shards (default: one per
+        worker, workers defaulting to the CPU count) and each shard is
+        written by a worker process through its own read-only connection, to
+        <prefix>.part-0001.csv.gz and so on, rows in id order. fmt is 'csv'
+        or 'jsonl', compressed as in export_emails_to_csv() (None for plain
+        files). <prefix>.manifest.json then lists every shard with its id
+        range, row count, size and SHA-256, and the totals.
+        
+        Each worker reads its own snapshot, so rows written while the export
+        runs may show up in some shards and not in others; call it on the
+        manager from snapshot() for a consistent set. Because worker
+        processes are spawned, scripts need an if __name__ == "__main__"
+        guard. progress is called as shards finish; if it raises
+        OperationCancelled the remaining shards are cancelled, the files
+        written so far are removed and the exception propagates.
+        
+        Returns the manifest, or None if the export failed.
+        """
+        if fmt not in ('csv', 'jsonl'):
+            raise ValueError(f"Sharded exports support 'csv' and 'jsonl', not '{fmt}'")
+        if compression is not None:
+            _export_compression(prefix, compression, compression_level)
+        if self.db_name == ':memory:':
+            raise ValueError("Sharded exports need a database file; worker processes cannot see :memory:")
+        workers = workers or os.cpu_count() or 1
+        shards = shards or workers
+        extension = EXPORT_FORMAT_EXTENSIONS[fmt] + (EXPORT_COMPRESSION_EXTENSIONS[compression] if compression else "")
+        db_uri = pathlib.Path(os.path.abspath(self.db_name)).as_uri() + '?mode=ro'
+        busy_timeout = PERFORMANCE_PROFILES[self.profile]['busy_timeout'] / 1000
+        
+        conditions, filter_params = self._subscription_filter(status=status, domain=domain)
+        with self.connection() as conn:
+            first_id, last_id = conn.execute("SELECT MIN(id), MAX(id) FROM email_subscriptions").fetchone()
+        ranges = []
+        if first_id is not None:
+            step = -(-(last_id - first_id + 1) // shards)
+            ranges = [(start, min(start + step - 1, last_id))
+                      for start in range(first_id, last_id + 1, step)]
+        where = ' AND '.join(['id BETWEEN ? AND ?'] + conditions)
+        sql = f"SELECT {', '.join(SUBSCRIPTION_EXPORT_COLUMNS)} FROM email_subscriptions WHERE {where} ORDER BY id"
+        
+        files = [f"{prefix}.part-{number:04d}{extension}" for number in range(1, len(ranges) + 1)]
+        results = {}
+        executor = ProcessPoolExecutor(min(workers, len(ranges)) or 1,
+                                       mp_context=multiprocessing.get_context('spawn'))
+        try:
+            futures = {
+                executor.submit(_export_shard, db_uri, busy_timeout, sql, (start, end) + tuple(filter_params),
+                                filename, fmt, compression, compression_level): index
+                for index, (filename, (start, end)) in enumerate(zip(files, ranges))
+            }
+            rows_done = 0
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                rows_done += results[futures[future]][0]
+                if progress:
+                    progress(rows_done, len(results) / len(ranges))
+        except Exception as e:
+            # Also covers OperationCancelled: never leave an incomplete set of shards
+            executor.shutdown(wait=True, cancel_futures=True)
+            for filename in files:
+                if os.path.exists(filename):
+                    os.remove(filename)
+            if isinstance(e, OperationCancelled):
+                raise
+            print(f"Error exporting shards: {e}")
+            return None
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        manifest = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'format': fmt,
+            'compression': compression,
+            'columns': list(SUBSCRIPTION_EXPORT_COLUMNS),
+            'filters': {'status': status, 'domain': domain},
+            'total_rows': sum(result[0] for result in results.values()),
+            'shards': [
+                {'file': os.path.basename(filename), 'first_id': start, 'last_id': end,
+                 'rows': results[index][0], 'bytes': results[index][1], 'sha256': results[index][2]}
+                for index, (filename, (start, end)) in enumerate(zip(files, ranges))
+            ],
+        }
+        with open(f"{prefix}.manifest.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+    
+    @_with_connection
+    def import_emails_from_csv(self, filename: str, skip_duplicates: bool = True,
+                               batch_size: int = IMPORT_BATCH_SIZE,
+                               commit_every: Optional[int] = None,
+                               progress: Optional[ProgressCallback] = None,
+                               validate: bool = True,
+                               reject_file: Optional[str] = None,
+                               workers: int = 1,
+                               chunk_bytes: int = IMPORT_CHUNK_BYTES,
+                               resume: bool = False) -> 'ImportResult':
         """
         Import email subscriptions from CSV file
-        Returns: (successful_imports, failed_imports)
+        
+        Each row is checked as it is read: a missing email or unknown status
+        is always rejected, and with validate the address also goes through
+        self.email_validator (syntax, IDNA domain, disposable domains).
+        Rejected rows count as failed and are written with their line number
+        and reason to reject_file, by default <filename>.rejects.csv next to
+        the input; the file is only created if something is rejected.
+        
+        The file is memory-mapped and read in blocks of about chunk_bytes
+        that end on a row boundary; each block is decoded once and parsed as
+        lists, picking the email, status, source and notes columns by their
+        header position. Rows are inserted with executemany in batches of
+        batch_size. With workers > 1 the blocks are parsed and validated in
+        that many processes while this thread stays the single writer,
+        inserting the results in file order so the outcome is identical to a
+        serial import.
+        
+        Duplicates are detected by the unique index on the normalized email
+        key instead of a per-row lookup, so John@X.com and john@x.com count
+        as one address.
+        
+        Every import is recorded in import_jobs, and after each block its
+        checkpoint (byte offset, line number, counters) is updated and
+        committed in the same transaction as the rows, so whatever was
+        committed always matches the checkpoint and an interrupted import
+        loses at most one block. With commit_every the commit is only issued
+        once roughly that many rows have been inserted since the last one.
+        Inside a transaction() block nothing is committed here. With resume, the latest unfinished job for the same file
+        (path, size and modification time) continues from its checkpoint
+        instead of starting over; otherwise a new job is started.
+        
+        progress is called after every block with the number of rows read and
+        the fraction of the file consumed. If it raises OperationCancelled, or
+        the import fails for any other reason, the open transaction is rolled
+        back (rows already committed with their checkpoint are kept, and the
+        job can be resumed from there) and the exception propagates. A file
+        that cannot be read or decoded also marks the job 'failed'.
+        
+        Returns: (successful_imports, failed_imports) with the number of
+        skipped duplicates available as result.skipped, the reject file path
+        as result.reject_file and the import job id as result.job_id
         """
         successful = 0
         failed = 0
+        skipped = 0
+        rows_read = 0
+        uncommitted = 0
+        batch = []
+        cursor = self.conn.cursor()
+        email_key = self.email_key
+        check_email = self.email_validator.validate if validate else None
+        if reject_file is None:
+            reject_file = os.path.splitext(filename)[0] + '.rejects.csv'
+        job_id = None
+        position = 0      # byte offset just after the last row read
+        line_number = 0   # physical lines consumed up to position
+        reject_offset = 0
+        rejects = None
+        reject_writer = None
+        
+        def reject(line: int, fields: List[Optional[str]], reason: str):
+            nonlocal failed, rejects, reject_writer
+            failed += 1
+            if reject_writer is None:
+                # A resumed job appends to the reject file it already started
+                rejects = open(reject_file, 'a' if reject_offset else 'w', newline='', encoding='utf-8')
+                reject_writer = csv.writer(rejects)
+                if not reject_offset:
+                    reject_writer.writerow(REJECT_FILE_COLUMNS)
+            reject_writer.writerow([line, reason] + fields)
+        
+        def flush():
+            nonlocal successful, failed, skipped, uncommitted
+            if not batch:
+                return
+            # OR IGNORE only swallows the email/email_key UNIQUE conflicts here:
+            # email is never empty and status is checked before a row reaches
+            # the batch
+            cursor.execute(NEXT_CHANGE_SEQ_SQL)
+            cursor.executemany(
+                f"""INSERT OR IGNORE INTO email_subscriptions
+                        (email, email_key, status, source, notes, updated_at, change_seq)
+                    VALUES (?, ?, ?, ?, ?, {CHANGE_TIMESTAMP_SQL}, {CHANGE_SEQ_SQL})""",
+                batch
+            )
+            inserted = cursor.rowcount
+            successful += inserted
+            if skip_duplicates:
+                skipped += len(batch) - inserted
+            else:
+                failed += len(batch) - inserted
+            uncommitted += len(batch)
+            batch.clear()
+        
+        def checkpoint(status: str = 'in_progress'):
+            """Record the job's position and commit it with the rows of this block (or every commit_every rows)"""
+            nonlocal uncommitted
+            if rejects is not None:
+                rejects.flush()
+            cursor.execute(
+                """UPDATE import_jobs
+                   SET status = ?, byte_offset = ?, line_number = ?, rows_read = ?,
+                       successful = ?, failed = ?, skipped = ?, reject_offset = ?,
+                       updated_at = CURRENT_TIMESTAMP
+                   WHERE id = ?""",
+                (status, position, line_number, rows_read, successful, failed, skipped,
+                 rejects.tell() if rejects is not None else reject_offset, job_id)
+            )
+            if uncommitted >= (commit_every or 0):
+                self._commit()
+                uncommitted = 0
         
         try:
-            with open(filename, 'r', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    try:
-                        email = row.get('email', '').strip()
-                        if not email:
-                            failed += 1
-                            continue
-                        
-                        # Check if email already exists
-                        if skip_duplicates:
-                            existing = self.get_email_subscription_by_email(email)
-                            if existing:
-                                continue
-                        
-                        status = row.get('status', 'active').strip() or 'active'
-                        source = row.get('source', '').strip() or None
-                        notes = row.get('notes', '').strip() or None
-                        
-                        self.create_email_subscription(email, status, source, notes)
-                        successful += 1
-                    except Exception as e:
-                        print(f"Error importing row {row}: {e}")
-                        failed += 1
-            return successful, failed
+            path = os.path.abspath(filename)
+            stat = os.stat(path)
+            job = self._find_import_job(path, stat) if resume else None
+            if job is not None:
+                job_id = job['id']
+                position = job['byte_offset']
+                line_number = job['line_number']
+                rows_read = job['rows_read']
+                successful = job['successful']
+                failed = job['failed']
+                skipped = job['skipped']
+                reject_file = job['reject_file'] or reject_file
+                reject_offset = job['reject_offset']
+                # Drop rejects written after the checkpoint; they are read again
+                if reject_offset and os.path.exists(reject_file):
+                    os.truncate(reject_file, reject_offset)
+            else:
+                cursor.execute(
+                    """INSERT INTO import_jobs (filename, file_size, file_mtime_ns, reject_file)
+                       VALUES (?, ?, ?, ?)""",
+                    (path, stat.st_size, stat.st_mtime_ns, reject_file)
+                )
+                job_id = cursor.lastrowid
+                self._commit()
+            
+            with open(path, 'rb') as f:
+                file_size = os.fstat(f.fileno()).st_size
+                header = f.readline()
+                fieldnames = next(csv.reader([header.decode('utf-8')]), [])
+                positions, width = _import_column_positions(fieldnames)
+                if not position:
+                    position = f.tell()
+                    line_number = 1
+                # mmap cannot map an empty file; there is nothing to import then
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if file_size else None
+            
+            executor = None
+            try:
+                ranges = _row_aligned_ranges(mm, position, file_size, chunk_bytes) if mm else iter(())
+                if workers > 1:
+                    disposable = sorted(self.email_validator.disposable_domains) if validate else None
+                    executor = ProcessPoolExecutor(
+                        workers, mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_import_worker,
+                        initargs=(disposable, self.email_provider_rules)
+                    )
+                    calls = ((path, start, end, positions, width) for start, end in ranges)
+                    results = _ordered_results(executor, _parse_import_chunk, calls, workers * 2)
+                else:
+                    results = (
+                        _parse_import_block(mm[start:end].decode('utf-8'), positions, width,
+                                            check_email, email_key) + (end,)
+                        for start, end in ranges
+                    )
+                try:
+                    for values, block_rejects, block_rows, block_lines, end in results:
+                        for line, fields, reason in block_rejects:
+                            reject(line_number + line, fields, reason)
+                        rows_read += block_rows
+                        for offset in range(0, len(values), batch_size):
+                            batch.extend(values[offset:offset + batch_size])
+                            flush()
+                        # Blocks end on row boundaries, so the whole block is
+                        # the unit of checkpointing
+                        position = end
+                        line_number += block_lines
+                        checkpoint()
+                        if progress:
+                            progress(rows_read, end / file_size)
+                finally:
+                    results.close()
+            finally:
+                if executor is not None:
+                    executor.shutdown(wait=True, cancel_futures=True)
+                if mm is not None:
+                    mm.close()
+            flush()
+            checkpoint('completed')
+            if progress:
+                progress(rows_read, 1.0)
         except Exception as e:
-            print(f"Error reading CSV file: {e}")
-            return successful, failed
-
+            # Drop everything after the last committed checkpoint, so the rows
+            # in the database always match the job and the caller sees the
+            # error instead of partial counts
+            self._rollback()
+            if job_id is not None and not isinstance(e, (OperationCancelled, sqlite3.Error)):
+                # The file itself is unreadable; resuming would fail the same way.
+                # Database errors (a lock timeout) leave the job resumable.
+                self._mark_import_job_failed(job_id)
+            raise
+        finally:
+            if rejects is not None:
+                rejects.close()
+        self._commit()
+        has_rejects = rejects is not None or reject_offset > 0
+        return ImportResult(successful, failed, skipped, reject_file if has_rejects else None, job_id)
+    
+    # ==================== IMPORT JOBS ====================
+    
+    def _find_import_job(self, path: str, stat: os.stat_result) -> Optional[Dict]:
+        """Latest unfinished import job for this exact version of a file"""
+        row = self.conn.execute(
+            """SELECT * FROM import_jobs
+               WHERE status = 'in_progress' AND filename = ? AND file_size = ? AND file_mtime_ns = ?
+               ORDER BY id DESC LIMIT 1""",
+            (path, stat.st_size, stat.st_mtime_ns)
+        ).fetchone()
+        return dict(row) if row else None
+    
+    @_with_connection
+    def get_import_jobs(self, unfinished_only: bool = True) -> List[Dict]:
+        """Import jobs, newest first; by default only those that can be resumed"""
+        where = "WHERE status = 'in_progress'" if unfinished_only else ""
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT * FROM import_jobs {where} ORDER BY id DESC")
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @_with_connection
+    def get_import_job(self, job_id: int) -> Optional[Dict]:
+        """Get an import job by ID"""
+        row = self.conn.execute("SELECT * FROM import_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+    
+    @_with_connection
+    def resume_import_job(self, job_id: int, **kwargs) -> 'ImportResult':
+        """
+        Continue an unfinished import job from its last checkpoint
+        
+        Raises ValueError if the job is not unfinished, if its file has
+        changed since it started, or if a newer unfinished job exists for the
+        same file. Other keyword arguments go to import_emails_from_csv().
+        """
+        job = self.get_import_job(job_id)
+        if job is None or job['status'] != 'in_progress':
+            raise ValueError(f"Import job {job_id} is not an unfinished import")
+        stat = os.stat(job['filename'])
+        latest = self._find_import_job(job['filename'], stat)
+        if latest is None:
+            raise ValueError(f"{job['filename']} has changed since import job {job_id} started")
+        if latest['id'] != job_id:
+            raise ValueError(f"Import job {latest['id']} is a newer unfinished import of the same file")
+        return self.import_emails_from_csv(job['filename'], resume=True, **kwargs)
+    
+    def _mark_import_job_failed(self, job_id: int):
+        """Record that an import stopped on an error it cannot resume past"""
+        self.conn.execute(
+            "UPDATE import_jobs SET status = 'failed', updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (job_id,)
+        )
+        self._commit()
+    
+    @_with_connection
+    def abandon_import_job(self, job_id: int) -> bool:
+        """Mark an unfinished import job as abandoned so it is no longer offered for resuming"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            """UPDATE import_jobs SET status = 'abandoned', updated_at = CURRENT_TIMESTAMP
+               WHERE id = ? AND status = 'in_progress'""",
+            (job_id,)
+        )
+        self._commit()
+        return cursor.rowcount > 0
+    
+    # ==================== DELTA EXPORT ====================
+    
+    @_with_connection
+    def export_changes_since(self, destination: str, fmt: str = 'csv',
+                             filename: Optional[str] = None,
+                             progress: Optional[ProgressCallback] = None,
+                             compression: Optional[str] = None,
+                             compression_level: Optional[int] = None) -> Optional[Dict]:
+        """
+        Export only the subscriptions changed since the last export to destination
+        
+        Each destination (any name, such as the downstream service) keeps a
+        watermark in export_watermarks: the newest change already exported
+        there, by its change number (change_seq). Rows inserted or updated
+        after it are written as 'upsert' and tombstones of deleted rows (or
+        of changed addresses) as 'delete', in the order the changes were
+        committed. The file has a change column, the
+        SUBSCRIPTION_EXPORT_COLUMNS, updated_at and change_seq; deletes only
+        carry the id and email. The
+        first export to a destination, or one after reset_export_watermark(),
+        writes every current subscription instead and moves the watermark to
+        the newest change, even if the table is empty. fmt is 'csv', 'jsonl' or
+        'excel', and CSV and JSON Lines can be compressed as in
+        export_emails_to_csv(). filename defaults to
+        <destination>-changes-<timestamp> with the format's and compression's
+        extensions.
+        
+        The watermark only moves once the file is written, so a failed export
+        is simply covered by the next one. Tombstones every destination has
+        already received are then deleted.
+        
+        Returns a dict with filename, upserts, deletes, since (the previous
+        watermark) and watermark, or None if the export failed.
+        """
+        if fmt not in EXPORT_FORMAT_EXTENSIONS:
+            raise ValueError(f"Unknown export format '{fmt}'")
+        if fmt == 'excel' and compression:
+            raise ValueError("Excel exports cannot be compressed")
+        if filename is None:
+            filename = f"{destination}-changes-{datetime.now():%Y%m%d-%H%M%S}{EXPORT_FORMAT_EXTENSIONS[fmt]}"
+            if compression:
+                filename += EXPORT_COMPRESSION_EXTENSIONS[_export_compression(filename, compression)]
+        if fmt != 'excel':
+            compression = _export_compression(filename, compression, compression_level)
+        cursor = self.conn.cursor()
+        row = cursor.execute(
+            "SELECT watermark FROM export_watermarks WHERE destination = ?", (destination,)
+        ).fetchone()
+        since = row[0] if row else None
+        
+        columns = ', '.join(SUBSCRIPTION_EXPORT_COLUMNS)
+        if since is None:
+            sql = f"""SELECT 'upsert' AS change, {columns}, updated_at, change_seq
+                      FROM email_subscriptions ORDER BY change_seq, id"""
+            params = ()
+            count_sql = "SELECT COUNT(*) FROM email_subscriptions"
+        else:
+            # Rows written by one bulk operation share a change number; the
+            # tombstone of a changed address always comes before its upsert
+            blanks = ', '.join(['NULL'] * (len(SUBSCRIPTION_EXPORT_COLUMNS) - 2))
+            sql = f"""SELECT 'upsert' AS change, {columns}, updated_at, change_seq
+                      FROM email_subscriptions WHERE change_seq > ?
+                      UNION ALL
+                      SELECT 'delete', subscription_id, email, {blanks}, deleted_at, change_seq
+                      FROM subscription_tombstones WHERE change_seq > ?
+                      ORDER BY change_seq, change, id"""
+            params = (since, since)
+            count_sql = """SELECT (SELECT COUNT(*) FROM email_subscriptions WHERE change_seq > ?)
+                                + (SELECT COUNT(*) FROM subscription_tombstones WHERE change_seq > ?)"""
+        
+        counts = {'upsert': 0, 'delete': 0}
+        watermark = since
+        if since is None:
+            # A full export covers every change made so far, even when the
+            # newest ones are deletes it does not write (or the table is
+            # empty), so the next export is a delta. Read before the query:
+            # changes committed in between are exported again, never missed.
+            watermark = cursor.execute("SELECT value FROM change_sequence").fetchone()[0]
+        
+        def tracked(chunks):
+            # Rows come in change order, so the last one seen is the new watermark
+            nonlocal watermark
+            yield next(chunks)
+            for rows in chunks:
+                for change_row in rows:
+                    counts[change_row[0]] += 1
+                watermark = max(watermark, rows[-1][-1])
+                yield rows
+        
+        try:
+            total = cursor.execute(count_sql, params).fetchone()[0] if progress else 0
+            with closing(self._iter_query_chunks(sql, params)) as chunks:
+                if fmt == 'excel':
+                    self._write_excel_export(filename, tracked(chunks), total, progress)
+                else:
+                    write = self._write_jsonl_export if fmt == 'jsonl' else self._write_csv_export
+                    write(filename, tracked(chunks), total, progress, compression, compression_level)
+        except ImportError:
+            print("openpyxl not installed. Install it with: pip install openpyxl")
+            return None
+        except OperationCancelled:
+            if os.path.exists(filename):
+                os.remove(filename)
+            raise
+        except Exception as e:
+            print(f"Error exporting changes: {e}")
+            return None
+        
+        cursor.execute(
+            """INSERT INTO export_watermarks (destination, watermark, last_filename, last_rows, exported_at)
+               VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+               ON CONFLICT (destination) DO UPDATE SET
+                   watermark = excluded.watermark, last_filename = excluded.last_filename,
+                   last_rows = excluded.last_rows, exported_at = excluded.exported_at""",
+            (destination, watermark, filename, counts['upsert'] + counts['delete'])
+        )
+        cursor.execute(
+            """DELETE FROM subscription_tombstones
+               WHERE change_seq <= (SELECT MIN(watermark) FROM export_watermarks)"""
+        )
+        self._commit()
+        return {'filename': filename, 'upserts': counts['upsert'], 'deletes': counts['delete'],
+                'since': since, 'watermark': watermark}
+    
+    @_with_connection
+    def get_export_watermarks(self) -> List[Dict]:
+        """Delta export destinations with their watermark and last export"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT * FROM export_watermarks ORDER BY destination")
+        return [dict(row) for row in cursor.fetchall()]
+    
+    @_with_connection
+    def reset_export_watermark(self, destination: str) -> bool:
+        """Forget a destination's watermark so its next delta export is a full one"""
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM export_watermarks WHERE destination = ?", (destination,))
+        self._commit()
+        return cursor.rowcount > 0
+    
+    # ==================== SNAPSHOTS AND BACKUPS ====================
+    
+    def backup(self, filename: str, pages_per_step: int = BACKUP_PAGES_PER_STEP,
+               pause: float = BACKUP_STEP_PAUSE,
+               progress: Optional[ProgressCallback] = None) -> bool:
+        """
+        Copy the live database to filename with the online backup API
+        
+        Pages are copied pages_per_step at a time with a pause of pause
+        seconds after each step, so other connections (the GUI, imports) are
+        only held up for one short step at a time. A write through another
+        connection makes SQLite restart the copy, so on a busy database use
+        larger steps or a shorter pause. The copy goes to a temporary file
+        that replaces filename once complete.
+        
+        progress is called after every step with the pages copied and the
+        fraction done. If it raises OperationCancelled the partial copy is
+        removed and the exception propagates.
+        """
+        temporary = f"{filename}.tmp"
+        
+        def step(status, remaining, total):
+            if progress:
+                progress(total - remaining, (total - remaining) / total if total else None)
+            if remaining and pause:
+                time.sleep(pause)
+        
+        try:
+            with self.connection() as conn, closing(sqlite3.connect(temporary)) as target:
+                conn.backup(target, pages=pages_per_step, progress=step)
+            os.replace(temporary, filename)
+            return True
+        except OperationCancelled:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            raise
+        except Exception as e:
+            print(f"Error backing up database: {e}")
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return False
+    
+    def create_snapshot(self, filename: str, method: str = 'vacuum', **backup_options):
+        """
+        Write a point-in-time copy of the database to filename
+        
+        'vacuum' uses VACUUM INTO: one read transaction that writes a
+        compacted copy, usually the fastest way. 'backup' copies pages
+        incrementally with backup() and takes its keyword arguments. Raises
+        on failure; filename must not exist for 'vacuum'.
+        """
+        if method == 'vacuum':
+            with self.connection() as conn:
+                conn.execute("VACUUM INTO ?", (filename,))
+        elif method == 'backup':
+            if not self.backup(filename, **backup_options):
+                raise sqlite3.DatabaseError(f"Backup to {filename} failed")
+        else:
+            raise ValueError(f"Unknown snapshot method '{method}'")
+    
+    @contextmanager
+    def snapshot(self, method: str = 'vacuum', **backup_options):
+        """
+        Run exports and reports against a point-in-time copy of the database
+        
+        Yields a DatabaseManager on a temporary snapshot (see
+        create_snapshot()) kept next to the database file, and deletes it
+        afterwards. Long exports then read the snapshot instead of holding a
+        read transaction on the live database, and everything read inside
+        the block, including sharded exports, sees the same moment:
+            
+            with db.snapshot() as snap:
+                snap.export_emails_to_csv("subscribers.csv.gz")
+                stats = snap.get_statistics()
+        """
+        if self.db_name == ':memory:':
+            raise ValueError("Snapshots need a database file")
+        directory = os.path.dirname(os.path.abspath(self.db_name))
+        with tempfile.TemporaryDirectory(prefix='.snapshot-', dir=directory) as snapshot_dir:
+            path = os.path.join(snapshot_dir, os.path.basename(self.db_name))
+            self.create_snapshot(path, method, **backup_options)
+            snapshot = DatabaseManager(path, profile=self.profile)
+            try:
+                yield snapshot
+            finally:
+                snapshot.close()
@@ -0,0 +1,125 @@
+"""
+Email address helpers shared by the database layer
+Normalizes addresses into the key used to detect duplicate subscriptions and
+validates addresses before they are imported
+"""
+
+import functools
+import os
+import re
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+
+
+# Mailbox providers whose addresses have more than one spelling.
+# domain -> (canonical domain, ignore dots in the local part, drop "+tag")
+PROVIDER_RULES: Dict[str, Tuple[str, bool, bool]] = {
+    'gmail.com': ('gmail.com', True, True),
+    'googlemail.com': ('gmail.com', True, True),
+    'outlook.com': ('outlook.com', False, True),
+    'hotmail.com': ('hotmail.com', False, True),
+    'live.com': ('live.com', False, True),
+    'icloud.com': ('icloud.com', False, True),
+    'fastmail.com': ('fastmail.com', False, True),
+    'protonmail.com': ('protonmail.com', False, True),
+    'proton.me': ('proton.me', False, True),
+}
+
+
+def normalize_email(email: str, provider_rules: bool = False) -> str:
+    """
+    Return the deduplication key for an email address
+    
+    The key is the trimmed, lowercased address. With provider_rules the
+    spellings PROVIDER_RULES knows to reach the same mailbox collapse to one
+    key as well, so John.Smith+news@googlemail.com becomes johnsmith@gmail.com.
+    """
+    key = email.strip().lower()
+    if not provider_rules:
+        return key
+    local, at, domain = key.rpartition('@')
+    rule = PROVIDER_RULES.get(domain) if at else None
+    if rule is None:
+        return key
+    canonical_domain, ignore_dots, drop_tag = rule
+    if drop_tag:
+        local = local.split('+', 1)[0]
+    if ignore_dots:
+        local = local.replace('.', '')
+    return f"{local}@{canonical_domain}"
+
+
+DISPOSABLE_DOMAINS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                       'disposable_domains.txt')
+
+# Practical subset of RFC 5322: dot-separated atoms before the '@' (Unicode
+# letters allowed), one or more DNS labels after it. Domains are checked in
+# their ASCII (IDNA) form, so the domain pattern only needs to cover ASCII.
+LOCAL_PART_PATTERN = re.compile(r"[\w!#$%&'*+/=?^`{|}~-]+(?:\.[\w!#$%&'*+/=?^`{|}~-]+)*")
+DOMAIN_PATTERN = re.compile(
+    r"(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z](?:[a-z0-9-]{0,61}[a-z0-9])?"
+)
+
+MAX_EMAIL_LENGTH = 254
+MAX_LOCAL_PART_LENGTH = 64
+
+
+def load_domain_list(filename: str) -> FrozenSet[str]:
+    """Read a one-domain-per-line file, skipping blank lines and # comments"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        return frozenset(
+            line.strip().lower() for line in f
+            if line.strip() and not line.lstrip().startswith('#')
+        )
+
+
+class EmailValidator:
+    """
+    Syntax and domain checks for email addresses
+    
+    validate() returns None for an acceptable address or a short reason.
+    Everything about the domain (IDNA conversion, label syntax, disposable
+    list) is decided once per distinct domain and cached, so the per-row cost
+    is a precompiled regex match on the local part plus a dict lookup.
+    """
+    
+    def __init__(self, disposable_domains: Optional[Iterable[str]] = None,
+                 domain_cache_size: int = 100000):
+        if disposable_domains is None:
+            disposable_domains = (load_domain_list(DISPOSABLE_DOMAINS_FILE)
+                                  if os.path.exists(DISPOSABLE_DOMAINS_FILE) else ())
+        self.disposable_domains = frozenset(d.lower() for d in disposable_domains)
+        self.domain_verdict = functools.lru_cache(maxsize=domain_cache_size)(self._check_domain)
+    
+    def validate(self, email: str) -> Optional[str]:
+        """Return None if email looks deliverable, otherwise the reason it was rejected"""
+        if len(email) > MAX_EMAIL_LENGTH:
+            return "email too long"
+        local, at, domain = email.rpartition('@')
+        if not at or not local:
+            return "missing '@' or local part"
+        if len(local) > MAX_LOCAL_PART_LENGTH:
+            return "local part too long"
+        if not LOCAL_PART_PATTERN.fullmatch(local):
+            return "invalid characters in local part"
+        return self.domain_verdict(domain.lower())
+    
+    def _check_domain(self, domain: str) -> Optional[str]:
+        if not domain:
+            return "missing domain"
+        if not domain.isascii():
+            try:
+                domain = domain.encode('idna').decode('ascii')
+            except UnicodeError:
+                return "invalid international domain"
+        if not DOMAIN_PATTERN.fullmatch(domain):
+            return "invalid domain"
+        # Reject subdomains of disposable providers too
+        labels = domain.split('.')
+        for i in range(len(labels) - 1):
+            if '.'.join(labels[i:]) in self.disposable_domains:
+                return "disposable domain"
+        return None
+    
+    def cache_info(self):
+        """Hit/miss statistics of the per-domain verdict cache"""
+        return self.domain_verdict.cache_info()
@@ -0,0 +1,134 @@
+"""
+Bounded LRU cache for rows looked up by id or email
+Used by DatabaseManager to avoid re-querying the same entities
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class EntityCache:
+    """
+    Thread-safe LRU cache with an optional time-to-live
+
+    An entry is stored under one primary key and may be reachable through
+    alias keys (a subscription by id and by email). Invalidating any of them
+    drops the entry and all of its aliases. Keys are (kind, value) tuples so
+    whole kinds can be invalidated at once.
+
+    Every invalidation bumps a generation counter for the kind. A reader
+    takes generation(kind) before it reads the row and passes it to put(),
+    which then skips the put if a write was invalidated in between, so a
+    row read before that write cannot be cached after it.
+    """
+
+    def __init__(self, max_size: int = 1000, ttl: Optional[float] = None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # primary key -> (value, expires_at, aliases)
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._aliases: Dict[Hashable, Hashable] = {}
+        self._generations: Dict[str, int] = {}
+        self._clears = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key (or one of its aliases), or None"""
+        with self._lock:
+            primary = self._aliases.get(key, key)
+            entry = self._entries.get(primary)
+            if entry is None:
+                self._misses += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                self._remove(primary)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(primary)
+            self._hits += 1
+            return value
+
+    def generation(self, kind: str) -> Tuple[int, int]:
+        """Token for put() that changes whenever an entry of kind is invalidated"""
+        with self._lock:
+            return self._clears, self._generations.get(kind, 0)
+
+    def put(self, key: Hashable, value: Any, aliases: Iterable[Hashable] = (),
+            generation: Optional[Tuple[int, int]] = None):
+        """
+        Store value under key and aliases, evicting the least recently used entries
+
+        With generation (from generation(key's kind)) nothing is stored if
+        that kind was invalidated since the token was taken.
+        """
+        aliases = tuple(aliases)
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != (self._clears, self._generations.get(key[0], 0)):
+                return
+            self._remove(key)
+            for alias in aliases:
+                if alias in self._aliases:
+                    self._remove(self._aliases[alias])
+            self._entries[key] = (value, expires_at, aliases)
+            for alias in aliases:
+                self._aliases[alias] = key
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def invalidate(self, key: Hashable):
+        """Drop the entry reachable through key, together with its aliases"""
+        with self._lock:
+            primary = self._aliases.get(key, key)
+            self._bump(key[0])
+            self._bump(primary[0])
+            self._remove(primary)
+
+    def invalidate_kind(self, kind: str):
+        """Drop every entry whose primary key is (kind, ...)"""
+        with self._lock:
+            self._bump(kind)
+            for primary in [k for k in self._entries if k[0] == kind]:
+                self._remove(primary)
+
+    def clear(self):
+        with self._lock:
+            self._clears += 1
+            self._entries.clear()
+            self._aliases.clear()
+
+    def _bump(self, kind: str):
+        self._generations[kind] = self._generations.get(kind, 0) + 1
+
+    def _remove(self, primary: Hashable):
+        entry = self._entries.pop(primary, None)
+        if entry is not None:
+            for alias in entry[2]:
+                self._aliases.pop(alias, None)
+
+    def get_stats(self) -> Dict:
+        """Hit/miss/eviction counters and current size"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+            }
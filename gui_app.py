@@ -3,23 +3,68 @@ GUI Application for Email Marketing Lists and Employee Management
 Built with tkinter
 """
 
+import argparse
 import tkinter as tk
+from contextlib import nullcontext
 from tkinter import ttk, messagebox, filedialog
-from database import DatabaseManager
+from database import (DatabaseManager, PERFORMANCE_PROFILES, EXPORT_COMPRESSION_EXTENSIONS,
+                      EXPORT_COMPRESSION_LEVEL_RANGES, EXPORT_FORMAT_EXTENSIONS)
+from background_jobs import JobQueue
 from datetime import datetime
 import os
 
 
+# Email Subscriptions tab: Treeview heading -> sortable database column
+EMAIL_TREE_COLUMNS = {
+    "ID": "id",
+    "Email": "email",
+    "Subscribed At": "subscribed_at",
+    "Status": "status",
+    "Source": "source",
+}
+EMAIL_PAGE_SIZE = 200
+# Fetch the next page once the visible window passes this fraction of the
+# list (or the previous one once it is this close to the top)
+EMAIL_PREFETCH_AT = 0.9
+# Pages kept in the list; scrolling further evicts the page at the other end
+EMAIL_WINDOW_PAGES = 5
+# Number of domains listed on the Statistics tab
+STATS_TOP_DOMAINS = 10
+# Maximum rows shown for a search box query
+SEARCH_RESULT_LIMIT = 500
+# How often (ms) the GUI polls background jobs for progress
+JOB_POLL_INTERVAL = 200
+# Selection handlers look up the same rows repeatedly; other processes'
+# changes show up after at most ENTITY_CACHE_TTL seconds
+ENTITY_CACHE_SIZE = 1024
+ENTITY_CACHE_TTL = 30
+
+
 class EmailMarketingApp:
     """Main GUI application class"""
     
-    def __init__(self, root):
+    def __init__(self, root, profile='balanced', seed_sample_data=False, provider_rules=None):
         self.root = root
         self.root.title("Email Marketing & Employee Management System")
         self.root.geometry("1200x700")
         
         # Initialize database
-        self.db = DatabaseManager()
+        self.db = DatabaseManager(profile=profile, cache_size=ENTITY_CACHE_SIZE,
+                                  cache_ttl=ENTITY_CACHE_TTL)
+        if provider_rules is not None:
+            report = self.db.set_email_provider_rules(provider_rules)
+            if report and report['groups']:
+                messagebox.showinfo(
+                    "Provider Rules",
+                    f"Provider rules switched {'on' if provider_rules else 'off'}: "
+                    f"{report['groups']} duplicate groups merged, {report['removed']} subscriptions removed"
+                )
+        if seed_sample_data:
+            self.db.seed_sample_data()
+        
+        # Imports and exports run here, each on its own pooled connection
+        self.jobs = JobQueue(self.db)
+        self.notified_jobs = set()
         
         # Create notebook for tabs
         self.notebook = ttk.Notebook(root)
@@ -30,10 +75,14 @@ class EmailMarketingApp:
         self.create_employees_tab()
         self.create_emails_tab()
         self.create_export_tab()
+        self.create_statistics_tab()
         
         # Status bar
-        self.status_bar = tk.Label(root, text="Ready", bd=1, relief=tk.SUNKEN, anchor=tk.W)
+        self.status_bar = tk.Label(root, text=f"Ready - {self.db.describe_settings()}",
+                                   bd=1, relief=tk.SUNKEN, anchor=tk.W)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        self.root.after(JOB_POLL_INTERVAL, self.poll_jobs)
     
     def update_status(self, message):
         """Update status bar"""
@@ -56,7 +105,8 @@ class EmailMarketingApp:
         self.dept_name_entry.grid(row=0, column=1, pady=5)
         
         ttk.Label(left_panel, text="Head of Department:").grid(row=1, column=0, sticky=tk.W, pady=5)
-        self.dept_head_combo = ttk.Combobox(left_panel, width=27, state="readonly")
+        self.dept_head_combo = ttk.Combobox(left_panel, width=27, state="readonly",
+                                            postcommand=self.load_head_choices)
         self.dept_head_combo.grid(row=1, column=1, pady=5)
         
         # Buttons
@@ -73,7 +123,7 @@ class EmailMarketingApp:
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # Treeview
-        columns = ("ID", "Name", "Head of Department")
+        columns = ("ID", "Name", "Head of Department", "Employees", "Supervisors")
         self.dept_tree = ttk.Treeview(right_panel, columns=columns, show="headings", height=15)
         
         for col in columns:
@@ -98,19 +148,18 @@ class EmailMarketingApp:
         for item in self.dept_tree.get_children():
             self.dept_tree.delete(item)
         
-        # Load departments
-        departments = self.db.get_all_departments()
-        employees = self.db.get_all_employees()
-        employee_dict = {emp['id']: emp['name'] for emp in employees}
-        
-        for dept in departments:
-            head_name = employee_dict.get(dept['head_of_department_id'], 'N/A')
+        # Load departments with their heads and counts in one query
+        for dept in self.db.get_departments_with_heads():
             self.dept_tree.insert("", tk.END, values=(
-                dept['id'], dept['name'], head_name
+                dept['id'], dept['name'], dept['head_name'] or 'N/A',
+                dept['employee_count'], dept['supervisor_count']
             ))
-        
-        # Update head combo
-        self.dept_head_combo['values'] = [f"{emp['id']} - {emp['name']}" for emp in employees]
+    
+    def load_head_choices(self):
+        """Fill the head of department combo when its list is opened"""
+        self.dept_head_combo['values'] = [
+            f"{emp_id} - {name}" for emp_id, name in self.db.get_employee_choices()
+        ]
     
     def on_department_select(self, event):
         """Handle department selection"""
@@ -241,6 +290,17 @@ class EmailMarketingApp:
         right_panel = ttk.LabelFrame(frame, text="Employees List", padding=10)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
         
+        # Search box
+        search_frame = ttk.Frame(right_panel)
+        search_frame.pack(fill=tk.X, pady=(0, 5))
+        
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.emp_search_entry = ttk.Entry(search_frame, width=30)
+        self.emp_search_entry.pack(side=tk.LEFT, padx=5)
+        self.emp_search_entry.bind("<Return>", lambda e: self.search_employees())
+        ttk.Button(search_frame, text="Search", command=self.search_employees).pack(side=tk.LEFT, padx=5)
+        ttk.Button(search_frame, text="Clear", command=self.clear_employee_search).pack(side=tk.LEFT, padx=5)
+        
         # Treeview
         columns = ("ID", "Name", "Email", "Department", "Position", "Supervisor", "Head")
         self.emp_tree = ttk.Treeview(right_panel, columns=columns, show="headings", height=15)
@@ -268,7 +328,14 @@ class EmailMarketingApp:
             self.emp_tree.delete(item)
         
         # Load employees
-        employees = self.db.get_all_employees()
+        self.insert_employee_rows(self.db.get_all_employees())
+        
+        # Update department combo
+        departments = self.db.get_all_departments()
+        self.emp_dept_combo['values'] = [f"{dept['id']} - {dept['name']}" for dept in departments]
+    
+    def insert_employee_rows(self, employees):
+        """Append employee rows to the employees list"""
         for emp in employees:
             self.emp_tree.insert("", tk.END, values=(
                 emp['id'], emp['name'], emp['email'], 
@@ -276,10 +343,22 @@ class EmailMarketingApp:
                 'Yes' if emp['is_supervisor'] else 'No',
                 'Yes' if emp['is_head'] else 'No'
             ))
-        
-        # Update department combo
-        departments = self.db.get_all_departments()
-        self.emp_dept_combo['values'] = [f"{dept['id']} - {dept['name']}" for dept in departments]
+    
+    def search_employees(self):
+        """Show the employees matching the search box (name, email or position prefix)"""
+        query = self.emp_search_entry.get().strip()
+        if not query:
+            self.refresh_employees()
+            return
+        employees = self.db.search_employees(query, SEARCH_RESULT_LIMIT)
+        self.emp_tree.delete(*self.emp_tree.get_children())
+        self.insert_employee_rows(employees)
+        self.update_status(f"{len(employees)} employees match '{query}'")
+    
+    def clear_employee_search(self):
+        """Clear the search box and show all employees again"""
+        self.emp_search_entry.delete(0, tk.END)
+        self.refresh_employees()
     
     def on_employee_select(self, event):
         """Handle employee selection"""
@@ -440,25 +519,48 @@ class EmailMarketingApp:
         self.email_filter_combo = ttk.Combobox(filter_frame, values=['All', 'active', 'unsubscribed', 'bounced'], state="readonly", width=15)
         self.email_filter_combo.set('All')
         self.email_filter_combo.pack(side=tk.LEFT, padx=5)
+        ttk.Label(filter_frame, text="Domain:").pack(side=tk.LEFT, padx=5)
+        self.email_domain_filter_entry = ttk.Entry(filter_frame, width=15)
+        self.email_domain_filter_entry.pack(side=tk.LEFT, padx=5)
         ttk.Button(filter_frame, text="Apply Filter", command=self.filter_emails).pack(side=tk.LEFT, padx=5)
         
+        # Search frame - full-text prefix search, honours the status filter
+        search_frame = ttk.LabelFrame(left_panel, text="Search", padding=5)
+        search_frame.grid(row=6, column=0, columnspan=2, pady=10, sticky=tk.EW)
+        
+        self.email_search_entry = ttk.Entry(search_frame, width=25)
+        self.email_search_entry.pack(side=tk.LEFT, padx=5)
+        self.email_search_entry.bind("<Return>", lambda e: self.search_emails())
+        ttk.Button(search_frame, text="Search", command=self.search_emails).pack(side=tk.LEFT, padx=5)
+        ttk.Button(search_frame, text="Clear", command=self.clear_email_search).pack(side=tk.LEFT, padx=5)
+        
         # Right panel - List
         right_panel = ttk.LabelFrame(frame, text="Email Subscriptions List", padding=10)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        # Treeview
-        columns = ("ID", "Email", "Subscribed At", "Status", "Source")
+        # Treeview - a window of a few pages that slides as the list is
+        # scrolled, so the tree never holds more than EMAIL_WINDOW_PAGES pages
+        columns = tuple(EMAIL_TREE_COLUMNS)
         self.email_tree = ttk.Treeview(right_panel, columns=columns, show="headings", height=15)
         
         for col in columns:
-            self.email_tree.heading(col, text=col)
+            self.email_tree.heading(col, text=col, command=lambda c=col: self.sort_emails(c))
             self.email_tree.column(col, width=150)
         
-        scrollbar = ttk.Scrollbar(right_panel, orient=tk.VERTICAL, command=self.email_tree.yview)
-        self.email_tree.configure(yscrollcommand=scrollbar.set)
+        self.email_scrollbar = ttk.Scrollbar(right_panel, orient=tk.VERTICAL, command=self.email_tree.yview)
+        self.email_tree.configure(yscrollcommand=self.on_email_scroll)
         
         self.email_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.email_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.email_status_filter = None
+        self.email_domain_filter = None
+        self.email_sort_by = 'subscribed_at'
+        self.email_sort_desc = True
+        self.email_pages = []  # (first row key, last row key, row count) of each page shown
+        self.email_at_start = True
+        self.email_all_loaded = False
+        self.email_loading = False
         
         self.email_tree.bind("<Double-1>", self.on_email_select)
         
@@ -467,27 +569,133 @@ class EmailMarketingApp:
         self.refresh_emails()
     
     def refresh_emails(self, status=None):
-        """Refresh email subscriptions list"""
+        """Refresh email subscriptions list, starting again from the first page"""
         # Clear tree
-        for item in self.email_tree.get_children():
-            self.email_tree.delete(item)
+        self.email_tree.delete(*self.email_tree.get_children())
         
-        # Load emails
-        subscriptions = self.db.get_all_email_subscriptions(status)
-        for sub in subscriptions:
-            self.email_tree.insert("", tk.END, values=(
-                sub['id'], sub['email'], sub['subscribed_at'], 
-                sub['status'], sub.get('source', '')
-            ))
+        self.email_status_filter = status
+        self.email_pages = []
+        self.email_at_start = True
+        self.email_all_loaded = False
+        self.load_more_emails()
+    
+    def fetch_email_page(self, after, descending):
+        """One page of subscriptions after a (sort value, id) key, as rows for the tree"""
+        subscriptions = self.db.get_email_subscriptions_page(
+            after, EMAIL_PAGE_SIZE, self.email_status_filter,
+            self.email_sort_by, descending, self.email_domain_filter
+        )
+        return subscriptions, [(sub['id'], sub['email'], sub['subscribed_at'],
+                                sub['status'], sub.get('source', '')) for sub in subscriptions]
+    
+    def email_page_entry(self, subscriptions):
+        """The (first key, last key, count) entry of a page in list order"""
+        first, last = subscriptions[0], subscriptions[-1]
+        return ((first[self.email_sort_by], first['id']),
+                (last[self.email_sort_by], last['id']), len(subscriptions))
+    
+    def load_more_emails(self):
+        """Append the next page to the list, evicting the top page once the window is full"""
+        if self.email_loading or self.email_all_loaded:
+            return
+        self.email_loading = True
+        try:
+            after = self.email_pages[-1][1] if self.email_pages else None
+            subscriptions, rows = self.fetch_email_page(after, self.email_sort_desc)
+            for values in rows:
+                self.email_tree.insert("", tk.END, values=values)
+            if len(subscriptions) < EMAIL_PAGE_SIZE:
+                self.email_all_loaded = True
+            if subscriptions:
+                self.email_pages.append(self.email_page_entry(subscriptions))
+            if len(self.email_pages) > EMAIL_WINDOW_PAGES:
+                count = self.email_pages.pop(0)[2]
+                self.email_tree.delete(*self.email_tree.get_children()[:count])
+                # Keep the same rows in view now that the ones above are gone
+                self.email_tree.yview_scroll(-count, 'units')
+                self.email_at_start = False
+        finally:
+            self.email_loading = False
+    
+    def load_previous_emails(self):
+        """Prepend the page before the list, evicting the bottom page once the window is full"""
+        if self.email_loading or self.email_at_start or not self.email_pages:
+            return
+        self.email_loading = True
+        try:
+            # Read backwards from the first row shown, then put the page in list order
+            subscriptions, rows = self.fetch_email_page(self.email_pages[0][0], not self.email_sort_desc)
+            subscriptions.reverse()
+            rows.reverse()
+            for index, values in enumerate(rows):
+                self.email_tree.insert("", index, values=values)
+            if len(subscriptions) < EMAIL_PAGE_SIZE:
+                self.email_at_start = True
+            if subscriptions:
+                self.email_pages.insert(0, self.email_page_entry(subscriptions))
+                self.email_tree.yview_scroll(len(subscriptions), 'units')
+            if len(self.email_pages) > EMAIL_WINDOW_PAGES:
+                count = self.email_pages.pop()[2]
+                self.email_tree.delete(*self.email_tree.get_children()[-count:])
+                self.email_all_loaded = False
+        finally:
+            self.email_loading = False
+    
+    def on_email_scroll(self, first, last):
+        """Keep the scrollbar in sync and slide the window near either end of the list"""
+        self.email_scrollbar.set(first, last)
+        if float(last) >= EMAIL_PREFETCH_AT and not self.email_all_loaded:
+            self.root.after_idle(self.load_more_emails)
+        elif float(first) <= 1 - EMAIL_PREFETCH_AT and not self.email_at_start:
+            self.root.after_idle(self.load_previous_emails)
+    
+    def sort_emails(self, column):
+        """Sort the email list by a column heading, toggling the direction on repeat clicks"""
+        sort_by = EMAIL_TREE_COLUMNS[column]
+        if sort_by == self.email_sort_by:
+            self.email_sort_desc = not self.email_sort_desc
+        else:
+            self.email_sort_by = sort_by
+            self.email_sort_desc = False
+        
+        for col, key in EMAIL_TREE_COLUMNS.items():
+            arrow = (" \u25bc" if self.email_sort_desc else " \u25b2") if key == sort_by else ""
+            self.email_tree.heading(col, text=col + arrow)
+        self.refresh_emails(self.email_status_filter)
     
     def filter_emails(self):
-        """Filter emails by status"""
+        """Filter emails by status and email domain"""
+        self.email_domain_filter = self.email_domain_filter_entry.get().strip() or None
         status = self.email_filter_combo.get()
         if status == 'All':
             self.refresh_emails()
         else:
             self.refresh_emails(status)
     
+    def search_emails(self):
+        """Show the subscriptions matching the search box (email, source or notes prefix)"""
+        query = self.email_search_entry.get().strip()
+        if not query:
+            self.refresh_emails(self.email_status_filter)
+            return
+        subscriptions = self.db.search_subscriptions(query, SEARCH_RESULT_LIMIT, self.email_status_filter)
+        self.email_tree.delete(*self.email_tree.get_children())
+        for sub in subscriptions:
+            self.email_tree.insert("", tk.END, values=(
+                sub['id'], sub['email'], sub['subscribed_at'],
+                sub['status'], sub.get('source', '')
+            ))
+        # Search results are a single batch; stop the scroll handler paging
+        self.email_pages = []
+        self.email_at_start = True
+        self.email_all_loaded = True
+        self.update_status(f"{len(subscriptions)} subscriptions match '{query}'")
+    
+    def clear_email_search(self):
+        """Clear the search box and go back to the paged list"""
+        self.email_search_entry.delete(0, tk.END)
+        self.refresh_emails(self.email_status_filter)
+    
     def on_email_select(self, event):
         """Handle email selection"""
         selection = self.email_tree.selection()
@@ -572,6 +780,98 @@ class EmailMarketingApp:
         if hasattr(self, 'current_email_id'):
             delattr(self, 'current_email_id')
     
+    # ==================== STATISTICS TAB ====================
+    
+    def create_statistics_tab(self):
+        """Create database statistics tab"""
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text="Statistics")
+        
+        totals_frame = ttk.LabelFrame(frame, text="Totals", padding=10)
+        totals_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        self.stats_labels = {}
+        rows = [
+            ("total_departments", "Departments:"),
+            ("total_employees", "Employees:"),
+            ("total_supervisors", "Supervisors:"),
+            ("total_subscriptions", "Email Subscriptions:"),
+            ("active", "Active:"),
+            ("unsubscribed", "Unsubscribed:"),
+            ("bounced", "Bounced:"),
+        ]
+        for row, (key, text) in enumerate(rows):
+            ttk.Label(totals_frame, text=text).grid(row=row, column=0, sticky=tk.W, pady=2)
+            self.stats_labels[key] = ttk.Label(totals_frame, text="0")
+            self.stats_labels[key].grid(row=row, column=1, sticky=tk.W, padx=10, pady=2)
+        
+        breakdown_frame = ttk.LabelFrame(frame, text="Departments Breakdown", padding=10)
+        breakdown_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        columns = ("Department", "Employees", "Supervisors")
+        self.stats_tree = ttk.Treeview(breakdown_frame, columns=columns, show="headings", height=8)
+        for col in columns:
+            self.stats_tree.heading(col, text=col)
+            self.stats_tree.column(col, width=150)
+        self.stats_tree.pack(fill=tk.BOTH, expand=True)
+        
+        domains_frame = ttk.LabelFrame(frame, text="Top Domains (active subscriptions)", padding=10)
+        domains_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        columns = ("Domain", "Subscriptions")
+        self.domains_tree = ttk.Treeview(domains_frame, columns=columns, show="headings", height=8)
+        for col in columns:
+            self.domains_tree.heading(col, text=col)
+            self.domains_tree.column(col, width=150)
+        self.domains_tree.pack(fill=tk.BOTH, expand=True)
+        
+        self.stats_snapshot_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(frame, text="Read from a point-in-time snapshot, leaving the live database free",
+                        variable=self.stats_snapshot_var).pack()
+        ttk.Button(frame, text="Refresh", command=self.refresh_statistics).pack(pady=5)
+        
+        self.refresh_statistics()
+    
+    def refresh_statistics(self):
+        """Reload statistics with the aggregate query, from a snapshot in the background if chosen"""
+        def read(db):
+            return db.get_statistics(), db.get_domain_breakdown(status='active', top_n=STATS_TOP_DOMAINS)
+        
+        if not self.stats_snapshot_var.get():
+            self.show_statistics(*read(self.db))
+            return
+        
+        def run(db, progress):
+            with db.snapshot() as snap:
+                return read(snap)
+        
+        def done(job):
+            if job.status == 'done':
+                self.show_statistics(*job.result)
+                self.update_status("Statistics read from a snapshot")
+            elif job.status == 'failed':
+                messagebox.showerror("Error", f"Reading statistics failed: {job.error}")
+        
+        self.jobs.submit("Statistics from a snapshot", run, done)
+        self.update_status("Statistics snapshot queued")
+    
+    def show_statistics(self, stats, domains):
+        """Fill the Statistics tab from get_statistics() and get_domain_breakdown() results"""
+        for key in ("total_departments", "total_employees", "total_supervisors", "total_subscriptions"):
+            self.stats_labels[key].config(text=f"{stats[key]:,}")
+        for status, count in stats['subscriptions_by_status'].items():
+            self.stats_labels[status].config(text=f"{count:,}")
+        
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        for dept in stats['departments']:
+            self.stats_tree.insert("", tk.END, values=(
+                dept['name'], dept['employee_count'], dept['supervisor_count']
+            ))
+        
+        self.domains_tree.delete(*self.domains_tree.get_children())
+        for row in domains:
+            self.domains_tree.insert("", tk.END, values=(row['domain'], f"{row['count']:,}"))
+    
     # ==================== EXPORT TAB ====================
     
     def create_export_tab(self):
@@ -586,22 +886,64 @@ class EmailMarketingApp:
         ttk.Label(export_frame, text="Export Format:").pack(anchor=tk.W, pady=5)
         self.export_format_var = tk.StringVar(value="CSV")
         ttk.Radiobutton(export_frame, text="CSV", variable=self.export_format_var, value="CSV").pack(anchor=tk.W)
+        ttk.Radiobutton(export_frame, text="JSON Lines (.jsonl)", variable=self.export_format_var, value="JSONL").pack(anchor=tk.W)
         ttk.Radiobutton(export_frame, text="Excel (.xlsx)", variable=self.export_format_var, value="Excel").pack(anchor=tk.W)
         
+        ttk.Label(export_frame, text="Compression (CSV and JSON Lines only):").pack(anchor=tk.W, pady=5)
+        self.export_compression_combo = ttk.Combobox(export_frame, values=['None'] + list(EXPORT_COMPRESSION_EXTENSIONS),
+                                                     state="readonly", width=20)
+        self.export_compression_combo.set('None')
+        self.export_compression_combo.pack(anchor=tk.W, pady=5)
+        self.export_compression_combo.bind("<<ComboboxSelected>>", self.on_export_compression_selected)
+        
+        ttk.Label(export_frame, text="Compression level (blank for default):").pack(anchor=tk.W, pady=5)
+        self.export_level_spin = ttk.Spinbox(export_frame, from_=0, to=9, width=5)
+        self.export_level_spin.pack(anchor=tk.W, pady=5)
+        
         ttk.Label(export_frame, text="Filter by Status:").pack(anchor=tk.W, pady=5)
         self.export_status_combo = ttk.Combobox(export_frame, values=['All', 'active', 'unsubscribed', 'bounced'], state="readonly", width=20)
         self.export_status_combo.set('All')
         self.export_status_combo.pack(anchor=tk.W, pady=5)
         
+        ttk.Label(export_frame, text="Filter by Email Domain (blank for all):").pack(anchor=tk.W, pady=5)
+        self.export_domain_entry = ttk.Entry(export_frame, width=23)
+        self.export_domain_entry.pack(anchor=tk.W, pady=5)
+        
+        ttk.Label(export_frame, text="Only changes since the last export to destination (blank for a full export):").pack(anchor=tk.W, pady=5)
+        self.export_destination_entry = ttk.Entry(export_frame, width=23)
+        self.export_destination_entry.pack(anchor=tk.W, pady=5)
+        
+        self.export_snapshot_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(export_frame, text="Export from a point-in-time snapshot, leaving the live database free "
+                                           "(full exports only)",
+                        variable=self.export_snapshot_var).pack(anchor=tk.W, pady=5)
+        
         ttk.Button(export_frame, text="Export Email List", command=self.export_emails).pack(pady=10)
         
         # Import section
         import_frame = ttk.LabelFrame(frame, text="Import Email List from CSV", padding=20)
         import_frame.pack(fill=tk.X, padx=10, pady=10)
         
+        ttk.Label(import_frame, text="Parser processes (use more for very large files):").pack(anchor=tk.W, pady=5)
+        self.import_workers_spin = ttk.Spinbox(import_frame, from_=1, to=os.cpu_count() or 1, width=5)
+        self.import_workers_spin.set(1)
+        self.import_workers_spin.pack(anchor=tk.W, pady=5)
+        
         ttk.Label(import_frame, text="Select CSV file to import:").pack(anchor=tk.W, pady=5)
         ttk.Button(import_frame, text="Browse and Import", command=self.import_emails).pack(pady=10)
         
+        # Background jobs section
+        jobs_frame = ttk.LabelFrame(frame, text="Background Jobs", padding=10)
+        jobs_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        self.job_progress = ttk.Progressbar(jobs_frame, mode="determinate", maximum=100)
+        self.job_progress.pack(fill=tk.X, pady=5)
+        
+        self.jobs_listbox = tk.Listbox(jobs_frame, height=4)
+        self.jobs_listbox.pack(fill=tk.X, pady=5)
+        
+        ttk.Button(jobs_frame, text="Cancel Selected Job", command=self.cancel_job).pack(pady=5)
+        
         # Results section
         results_frame = ttk.LabelFrame(frame, text="Results", padding=20)
         results_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -612,43 +954,86 @@ class EmailMarketingApp:
         scrollbar = ttk.Scrollbar(results_frame, orient=tk.VERTICAL, command=self.results_text.yview)
         self.results_text.configure(yscrollcommand=scrollbar.set)
     
+    def on_export_compression_selected(self, event=None):
+        """Limit the level spinbox to the levels the chosen codec accepts"""
+        lowest, highest = EXPORT_COMPRESSION_LEVEL_RANGES.get(self.export_compression_combo.get(), (0, 9))
+        self.export_level_spin.configure(from_=lowest, to=highest)
+        level = self.export_level_spin.get().strip()
+        if level.isdigit() and not lowest <= int(level) <= highest:
+            self.export_level_spin.set(min(max(int(level), lowest), highest))
+    
     def export_emails(self):
-        """Export emails to CSV or Excel"""
+        """Export emails to CSV, JSON Lines or Excel in the background"""
         format_type = self.export_format_var.get()
+        fmt = {'CSV': 'csv', 'JSONL': 'jsonl', 'Excel': 'excel'}[format_type]
         status = self.export_status_combo.get()
         status_filter = None if status == 'All' else status
+        domain = self.export_domain_entry.get().strip() or None
+        destination = self.export_destination_entry.get().strip() or None
+        # Delta exports move their watermark in the live database, so they never use a snapshot
+        use_snapshot = self.export_snapshot_var.get() and not destination
+        compression = self.export_compression_combo.get()
+        compression = None if compression == 'None' or fmt == 'excel' else compression
+        try:
+            level = int(self.export_level_spin.get()) if self.export_level_spin.get().strip() else None
+        except ValueError:
+            messagebox.showerror("Error", "Compression level must be a number")
+            return
+        if compression and level is not None:
+            lowest, highest = EXPORT_COMPRESSION_LEVEL_RANGES[compression]
+            if not lowest <= level <= highest:
+                messagebox.showerror("Error", f"{compression} compression levels go from {lowest} to {highest}")
+                return
         
+        extension = EXPORT_FORMAT_EXTENSIONS[fmt] + (EXPORT_COMPRESSION_EXTENSIONS[compression] if compression else "")
         filename = filedialog.asksaveasfilename(
-            defaultextension=f".{'csv' if format_type == 'CSV' else 'xlsx'}",
+            defaultextension=extension,
             filetypes=[
-                ("CSV files", "*.csv"),
-                ("Excel files", "*.xlsx"),
-                ("All files", "*.*")
-            ] if format_type == 'CSV' else [
-                ("Excel files", "*.xlsx"),
+                (f"{format_type} files", f"*{extension}"),
                 ("All files", "*.*")
             ]
         )
         
         if filename:
-            try:
-                if format_type == 'CSV':
-                    success = self.db.export_emails_to_csv(filename, status_filter)
-                else:
-                    success = self.db.export_emails_to_excel(filename, status_filter)
-                
-                if success:
-                    messagebox.showinfo("Success", f"Email list exported successfully to {filename}")
+            def run(db, progress):
+                if destination:
+                    return db.export_changes_since(destination, fmt, filename, progress=progress,
+                                                   compression=compression, compression_level=level)
+                with db.snapshot() if use_snapshot else nullcontext(db) as source:
+                    if fmt == 'csv':
+                        return source.export_emails_to_csv(filename, status_filter, progress=progress, domain=domain,
+                                                           compression=compression, compression_level=level)
+                    if fmt == 'jsonl':
+                        return source.export_emails_to_jsonl(filename, status_filter, progress=progress, domain=domain,
+                                                             compression=compression, compression_level=level)
+                    return source.export_emails_to_excel(filename, status_filter, progress=progress, domain=domain)
+            
+            def done(job):
+                if job.status == 'done' and job.result:
                     self.results_text.insert(tk.END, f"Export successful: {filename}\n")
-                    self.results_text.insert(tk.END, f"Format: {format_type}, Status filter: {status}\n\n")
+                    if destination:
+                        changes = job.result
+                        since = f"change {changes['since']}" if changes['since'] is not None else "the beginning"
+                        self.results_text.insert(tk.END, f"Changes for {destination} since {since}: "
+                                                         f"{changes['upserts']} upserts, {changes['deletes']} deletes\n\n")
+                    else:
+                        self.results_text.insert(tk.END, f"Format: {format_type}, Compression: {compression or 'None'}, "
+                                                         f"Status filter: {status}, Domain filter: {domain or 'All'}"
+                                                         f"{', from a snapshot' if use_snapshot else ''}\n\n")
                     self.update_status(f"Exported to {filename}")
+                    messagebox.showinfo("Success", f"Email list exported successfully to {filename}")
+                elif job.status == 'cancelled':
+                    self.results_text.insert(tk.END, f"Export cancelled: {filename}\n\n")
+                    self.update_status("Export cancelled")
                 else:
-                    messagebox.showerror("Error", "Failed to export email list")
-            except Exception as e:
-                messagebox.showerror("Error", f"Export failed: {e}")
+                    messagebox.showerror("Error", f"Export failed: {job.error or 'see console output'}")
+            
+            # A delta export moves the destination's watermark, so it writes
+            self.jobs.submit(f"Export {os.path.basename(filename)}", run, done, writes=bool(destination))
+            self.update_status(f"Export to {filename} queued")
     
     def import_emails(self):
-        """Import emails from CSV"""
+        """Import emails from CSV in the background"""
         filename = filedialog.askopenfilename(
             filetypes=[
                 ("CSV files", "*.csv"),
@@ -656,31 +1041,115 @@ class EmailMarketingApp:
             ]
         )
         
+        try:
+            workers = max(1, int(self.import_workers_spin.get()))
+        except ValueError:
+            workers = 1
+        
         if filename:
-            try:
-                successful, failed = self.db.import_emails_from_csv(filename)
-                messagebox.showinfo(
-                    "Import Complete",
-                    f"Import completed!\n\nSuccessful: {successful}\nFailed: {failed}"
-                )
-                self.results_text.insert(tk.END, f"Import from: {filename}\n")
-                self.results_text.insert(tk.END, f"Successful imports: {successful}\n")
-                self.results_text.insert(tk.END, f"Failed imports: {failed}\n\n")
-                self.refresh_emails()
-                self.update_status(f"Imported {successful} emails from {filename}")
-            except Exception as e:
-                messagebox.showerror("Error", f"Import failed: {e}")
+            def run(db, progress):
+                # One transaction for the whole file: cancelling rolls back
+                # every row and the import job, instead of keeping the blocks
+                # committed so far as a job to resume
+                with db.transaction():
+                    return db.import_emails_from_csv(filename, progress=progress, workers=workers)
+            
+            def done(job):
+                if job.status == 'done':
+                    result = job.result
+                    successful, failed = result
+                    self.results_text.insert(tk.END, f"Import from: {filename}\n")
+                    self.results_text.insert(tk.END, f"Successful imports: {successful}\n")
+                    self.results_text.insert(tk.END, f"Skipped duplicates: {result.skipped}\n")
+                    self.results_text.insert(tk.END, f"Failed imports: {failed}\n")
+                    if result.reject_file:
+                        self.results_text.insert(tk.END, f"Rejected rows: {result.reject_file}\n")
+                    self.results_text.insert(tk.END, "\n")
+                    self.refresh_emails()
+                    self.update_status(f"Imported {successful} emails from {filename}")
+                    messagebox.showinfo(
+                        "Import Complete",
+                        f"Import completed!\n\nSuccessful: {successful}\n"
+                        f"Skipped duplicates: {result.skipped}\nFailed: {failed}"
+                        + (f"\n\nRejected rows were written to {result.reject_file}" if result.reject_file else "")
+                    )
+                elif job.status == 'cancelled':
+                    self.results_text.insert(tk.END, f"Import cancelled, changes rolled back: {filename}\n\n")
+                    self.update_status("Import cancelled")
+                else:
+                    messagebox.showerror("Error", f"Import failed: {job.error}")
+            
+            self.jobs.submit(f"Import {os.path.basename(filename)}", run, done, writes=True)
+            self.update_status(f"Import from {filename} queued")
+    
+    # ==================== BACKGROUND JOBS ====================
+    
+    def poll_jobs(self):
+        """Show background job progress and hand finished jobs back to the GUI"""
+        selected = self.jobs_listbox.curselection()
+        self.jobs_listbox.delete(0, tk.END)
+        for job in self.jobs.jobs:
+            self.jobs_listbox.insert(tk.END, job.summary())
+        for index in selected:
+            if index < self.jobs_listbox.size():
+                self.jobs_listbox.selection_set(index)
+        
+        running = [job for job in self.jobs.active_jobs() if job.status == 'running']
+        if running:
+            job = running[0]
+            self.job_progress['value'] = (job.fraction or 0) * 100
+            queued = len(self.jobs.active_jobs()) - 1
+            self.status_bar.config(
+                text=job.summary() + (f" (+{queued} more)" if queued else "")
+            )
+        else:
+            self.job_progress['value'] = 0
+        
+        for job in self.jobs.jobs:
+            if job.finished and job.id not in self.notified_jobs:
+                self.notified_jobs.add(job.id)
+                if job.on_done:
+                    job.on_done(job)
+        
+        self.root.after(JOB_POLL_INTERVAL, self.poll_jobs)
+    
+    def cancel_job(self):
+        """Cancel the job selected in the jobs list"""
+        selection = self.jobs_listbox.curselection()
+        if not selection:
+            messagebox.showerror("Error", "Please select a job to cancel")
+            return
+        job = self.jobs.jobs[selection[0]]
+        if job.finished:
+            messagebox.showinfo("Info", "That job has already finished")
+            return
+        job.cancel()
+        self.update_status(f"Cancelling job #{job.id}")
     
     def __del__(self):
         """Cleanup"""
+        if hasattr(self, 'jobs'):
+            self.jobs.shutdown()
         if hasattr(self, 'db'):
             self.db.close()
 
 
 def main():
     """Main entry point"""
+    parser = argparse.ArgumentParser(description="Email Marketing & Employee Management GUI")
+    parser.add_argument("--profile", choices=list(PERFORMANCE_PROFILES), default="balanced",
+                        help="SQLite performance profile (default: balanced)")
+    parser.add_argument("--seed-sample-data", action="store_true",
+                        help="Load the sample departments, employees and subscriptions")
+    parser.add_argument("--provider-rules", action="store_const", const=True,
+                        help="Treat gmail dots and +tags as the same address when detecting duplicates "
+                             "(stored in the database)")
+    parser.add_argument("--no-provider-rules", dest="provider_rules", action="store_const", const=False,
+                        help="Switch provider rules off again")
+    args = parser.parse_args()
+    
     root = tk.Tk()
-    app = EmailMarketingApp(root)
+    app = EmailMarketingApp(root, args.profile, args.seed_sample_data, args.provider_rules)
     root.mainloop()
 
 
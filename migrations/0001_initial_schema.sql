@@ -42,33 +42,5 @@ CREATE INDEX IF NOT EXISTS idx_employees_department ON employees(department_id);
 CREATE INDEX IF NOT EXISTS idx_employees_supervisor ON employees(is_supervisor);
 CREATE INDEX IF NOT EXISTS idx_email_subscriptions_status ON email_subscriptions(status);
 CREATE INDEX IF NOT EXISTS idx_email_subscriptions_email ON email_subscriptions(email);
-
--- Insert sample data for testing
--- First, create some departments
-INSERT OR IGNORE INTO departments (id, name) VALUES 
-    (1, 'Marketing'),
-    (2, 'Sales'),
-    (3, 'IT');
-
--- Insert sample employees (we'll update head_of_department after employees are created)
-INSERT OR IGNORE INTO employees (id, name, email, department_id, is_supervisor, is_head, position, hire_date) VALUES
-    (1, 'John Smith', 'john.smith@company.com', 1, 1, 1, 'Head of Marketing', '2020-01-15'),
-    (2, 'Jane Doe', 'jane.doe@company.com', 1, 1, 0, 'Marketing Supervisor', '2021-03-20'),
-    (3, 'Bob Johnson', 'bob.johnson@company.com', 2, 1, 1, 'Head of Sales', '2019-06-10'),
-    (4, 'Alice Williams', 'alice.williams@company.com', 2, 1, 0, 'Sales Supervisor', '2020-09-05'),
-    (5, 'Charlie Brown', 'charlie.brown@company.com', 3, 1, 1, 'Head of IT', '2018-11-12'),
-    (6, 'Diana Prince', 'diana.prince@company.com', 3, 1, 0, 'IT Supervisor', '2021-07-18');
-
--- Update departments with head_of_department_id
-UPDATE departments SET head_of_department_id = 1 WHERE id = 1;
-UPDATE departments SET head_of_department_id = 3 WHERE id = 2;
-UPDATE departments SET head_of_department_id = 5 WHERE id = 3;
-
--- Insert sample email subscriptions
-INSERT OR IGNORE INTO email_subscriptions (email, status, source) VALUES
-    ('customer1@example.com', 'active', 'website'),
-    ('customer2@example.com', 'active', 'website'),
-    ('customer3@example.com', 'active', 'newsletter'),
-    ('customer4@example.com', 'unsubscribed', 'website'),
-    ('customer5@example.com', 'active', 'social_media');
-
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_subscribed ON email_subscriptions(subscribed_at);
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_status_subscribed ON email_subscriptions(status, subscribed_at);
@@ -0,0 +1,111 @@
+-- Trigger-maintained counters so dashboards never have to COUNT(*) large tables
+--
+-- scope                    key
+-- subscription_status      status
+-- subscription_source      source ('' when NULL)
+-- department_employees     department id
+-- department_supervisors   department id
+-- department_heads         department id
+CREATE TABLE IF NOT EXISTS summary_counts (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, key)
+) WITHOUT ROWID;
+
+-- Email subscriptions
+CREATE TRIGGER IF NOT EXISTS trg_summary_subscriptions_insert
+AFTER INSERT ON email_subscriptions
+BEGIN
+    INSERT INTO summary_counts (scope, key, count) VALUES ('subscription_status', COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (scope, key) DO UPDATE SET count = count + 1;
+    INSERT INTO summary_counts (scope, key, count) VALUES ('subscription_source', COALESCE(NEW.source, ''), 1)
+        ON CONFLICT (scope, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_summary_subscriptions_delete
+AFTER DELETE ON email_subscriptions
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+        WHERE scope = 'subscription_status' AND key = COALESCE(OLD.status, '');
+    UPDATE summary_counts SET count = count - 1
+        WHERE scope = 'subscription_source' AND key = COALESCE(OLD.source, '');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_summary_subscriptions_status
+AFTER UPDATE OF status ON email_subscriptions
+WHEN OLD.status IS NOT NEW.status
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+        WHERE scope = 'subscription_status' AND key = COALESCE(OLD.status, '');
+    INSERT INTO summary_counts (scope, key, count) VALUES ('subscription_status', COALESCE(NEW.status, ''), 1)
+        ON CONFLICT (scope, key) DO UPDATE SET count = count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_summary_subscriptions_source
+AFTER UPDATE OF source ON email_subscriptions
+WHEN OLD.source IS NOT NEW.source
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+        WHERE scope = 'subscription_source' AND key = COALESCE(OLD.source, '');
+    INSERT INTO summary_counts (scope, key, count) VALUES ('subscription_source', COALESCE(NEW.source, ''), 1)
+        ON CONFLICT (scope, key) DO UPDATE SET count = count + 1;
+END;
+
+-- Employees
+CREATE TRIGGER IF NOT EXISTS trg_summary_employees_insert
+AFTER INSERT ON employees
+BEGIN
+    INSERT INTO summary_counts (scope, key, count) VALUES
+        ('department_employees', NEW.department_id, 1),
+        ('department_supervisors', NEW.department_id, CASE WHEN NEW.is_supervisor THEN 1 ELSE 0 END),
+        ('department_heads', NEW.department_id, CASE WHEN NEW.is_head THEN 1 ELSE 0 END)
+        ON CONFLICT (scope, key) DO UPDATE SET count = count + excluded.count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_summary_employees_delete
+AFTER DELETE ON employees
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+        WHERE scope = 'department_employees' AND key = CAST(OLD.department_id AS TEXT);
+    UPDATE summary_counts SET count = count - 1
+        WHERE scope = 'department_supervisors' AND key = CAST(OLD.department_id AS TEXT)
+          AND OLD.is_supervisor;
+    UPDATE summary_counts SET count = count - 1
+        WHERE scope = 'department_heads' AND key = CAST(OLD.department_id AS TEXT)
+          AND OLD.is_head;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_summary_employees_update
+AFTER UPDATE OF department_id, is_supervisor, is_head ON employees
+BEGIN
+    UPDATE summary_counts SET count = count - 1
+        WHERE scope = 'department_employees' AND key = CAST(OLD.department_id AS TEXT);
+    UPDATE summary_counts SET count = count - 1
+        WHERE scope = 'department_supervisors' AND key = CAST(OLD.department_id AS TEXT)
+          AND OLD.is_supervisor;
+    UPDATE summary_counts SET count = count - 1
+        WHERE scope = 'department_heads' AND key = CAST(OLD.department_id AS TEXT)
+          AND OLD.is_head;
+    INSERT INTO summary_counts (scope, key, count) VALUES
+        ('department_employees', NEW.department_id, 1),
+        ('department_supervisors', NEW.department_id, CASE WHEN NEW.is_supervisor THEN 1 ELSE 0 END),
+        ('department_heads', NEW.department_id, CASE WHEN NEW.is_head THEN 1 ELSE 0 END)
+        ON CONFLICT (scope, key) DO UPDATE SET count = count + excluded.count;
+END;
+
+-- Backfill from the existing rows
+DELETE FROM summary_counts;
+
+INSERT INTO summary_counts (scope, key, count)
+    SELECT 'subscription_status', COALESCE(status, ''), COUNT(*) FROM email_subscriptions GROUP BY 2;
+INSERT INTO summary_counts (scope, key, count)
+    SELECT 'subscription_source', COALESCE(source, ''), COUNT(*) FROM email_subscriptions GROUP BY 2;
+INSERT INTO summary_counts (scope, key, count)
+    SELECT 'department_employees', department_id, COUNT(*) FROM employees GROUP BY 2;
+INSERT INTO summary_counts (scope, key, count)
+    SELECT 'department_supervisors', department_id, SUM(CASE WHEN is_supervisor THEN 1 ELSE 0 END)
+    FROM employees GROUP BY 2;
+INSERT INTO summary_counts (scope, key, count)
+    SELECT 'department_heads', department_id, SUM(CASE WHEN is_head THEN 1 ELSE 0 END)
+    FROM employees GROUP BY 2;
@@ -0,0 +1,66 @@
+-- FTS5 full-text indexes for subscription and employee search
+-- Both are external-content tables: they index the base tables' columns
+-- without storing a second copy, and triggers keep them in sync.
+-- prefix='2 3' adds prefix indexes so short "jo*" style queries stay fast.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS subscriptions_fts USING fts5(
+    email, source, notes,
+    content='email_subscriptions', content_rowid='id',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_subscriptions_fts_insert
+AFTER INSERT ON email_subscriptions
+BEGIN
+    INSERT INTO subscriptions_fts (rowid, email, source, notes)
+        VALUES (NEW.id, NEW.email, NEW.source, NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_subscriptions_fts_delete
+AFTER DELETE ON email_subscriptions
+BEGIN
+    INSERT INTO subscriptions_fts (subscriptions_fts, rowid, email, source, notes)
+        VALUES ('delete', OLD.id, OLD.email, OLD.source, OLD.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_subscriptions_fts_update
+AFTER UPDATE OF email, source, notes ON email_subscriptions
+BEGIN
+    INSERT INTO subscriptions_fts (subscriptions_fts, rowid, email, source, notes)
+        VALUES ('delete', OLD.id, OLD.email, OLD.source, OLD.notes);
+    INSERT INTO subscriptions_fts (rowid, email, source, notes)
+        VALUES (NEW.id, NEW.email, NEW.source, NEW.notes);
+END;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+    name, email, position,
+    content='employees', content_rowid='id',
+    prefix='2 3'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_fts_insert
+AFTER INSERT ON employees
+BEGIN
+    INSERT INTO employees_fts (rowid, name, email, position)
+        VALUES (NEW.id, NEW.name, NEW.email, NEW.position);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_fts_delete
+AFTER DELETE ON employees
+BEGIN
+    INSERT INTO employees_fts (employees_fts, rowid, name, email, position)
+        VALUES ('delete', OLD.id, OLD.name, OLD.email, OLD.position);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_employees_fts_update
+AFTER UPDATE OF name, email, position ON employees
+BEGIN
+    INSERT INTO employees_fts (employees_fts, rowid, name, email, position)
+        VALUES ('delete', OLD.id, OLD.name, OLD.email, OLD.position);
+    INSERT INTO employees_fts (rowid, name, email, position)
+        VALUES (NEW.id, NEW.name, NEW.email, NEW.position);
+END;
+
+-- Index the existing rows
+INSERT INTO subscriptions_fts (subscriptions_fts) VALUES ('rebuild');
+INSERT INTO employees_fts (employees_fts) VALUES ('rebuild');
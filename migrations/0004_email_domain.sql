@@ -0,0 +1,18 @@
+-- Lowercased domain part of each subscription email, for per-domain counts
+-- and filters. A VIRTUAL generated column costs no space in the table; the
+-- indexes below store it, and building them backfills every existing row.
+-- Emails without an '@' get a NULL domain.
+ALTER TABLE email_subscriptions ADD COLUMN domain TEXT
+    GENERATED ALWAYS AS (
+        CASE WHEN instr(email, '@') > 0
+             THEN lower(trim(substr(email, instr(email, '@') + 1)))
+        END
+    ) VIRTUAL;
+
+-- Domain filters and the unfiltered breakdown (covering, already grouped)
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_domain_status
+    ON email_subscriptions(domain, status);
+
+-- Breakdown of a single status
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_status_domain
+    ON email_subscriptions(status, domain);
@@ -0,0 +1,37 @@
+-- Case-insensitive uniqueness for subscription emails
+--
+-- email_key is the normalized address (see email_utils.normalize_email).
+-- DatabaseManager always writes it, applying provider rules if configured;
+-- the triggers fill in the basic lower(trim(email)) key for writers that
+-- leave it out, so other tools cannot bypass the unique index either.
+ALTER TABLE email_subscriptions ADD COLUMN email_key TEXT;
+
+-- Backfill: only the earliest row of each key gets it. Later rows keep a
+-- NULL key until DatabaseManager.dedupe_email_subscriptions() merges them.
+UPDATE email_subscriptions SET email_key = lower(trim(email))
+WHERE id IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY lower(trim(email)) ORDER BY subscribed_at, id
+        ) AS position
+        FROM email_subscriptions
+    )
+    WHERE position = 1
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_email_subscriptions_email_key
+    ON email_subscriptions(email_key);
+
+CREATE TRIGGER IF NOT EXISTS trg_email_key_insert
+AFTER INSERT ON email_subscriptions
+WHEN NEW.email_key IS NULL
+BEGIN
+    UPDATE email_subscriptions SET email_key = lower(trim(NEW.email)) WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_email_key_update
+AFTER UPDATE OF email ON email_subscriptions
+WHEN NEW.email IS NOT OLD.email AND NEW.email_key IS OLD.email_key
+BEGIN
+    UPDATE email_subscriptions SET email_key = lower(trim(NEW.email)) WHERE id = NEW.id;
+END;
@@ -0,0 +1,28 @@
+-- One row per CSV import, updated in the same transaction as each batch of
+-- inserted rows. An import that dies leaves its row 'in_progress' with the
+-- position of the last committed batch, so it can be resumed from there.
+--
+-- byte_offset    file position just after the last committed row
+-- line_number    physical lines consumed up to byte_offset (header included)
+-- reject_offset  size of the reject file at that point
+-- file_size and file_mtime_ns identify the file version being imported.
+CREATE TABLE IF NOT EXISTS import_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    filename TEXT NOT NULL,
+    file_size INTEGER NOT NULL,
+    file_mtime_ns INTEGER NOT NULL,
+    reject_file TEXT,
+    status TEXT NOT NULL DEFAULT 'in_progress'
+        CHECK (status IN ('in_progress', 'completed', 'failed', 'abandoned')),
+    byte_offset INTEGER NOT NULL DEFAULT 0,
+    line_number INTEGER NOT NULL DEFAULT 0,
+    rows_read INTEGER NOT NULL DEFAULT 0,
+    successful INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    skipped INTEGER NOT NULL DEFAULT 0,
+    reject_offset INTEGER NOT NULL DEFAULT 0,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_import_jobs_status_filename ON import_jobs(status, filename);
@@ -0,0 +1,68 @@
+-- Change tracking for delta exports (DatabaseManager.export_changes_since)
+--
+-- updated_at is a UTC timestamp with milliseconds ('YYYY-MM-DD HH:MM:SS.SSS',
+-- so text order is time order). DatabaseManager writes it on insert and
+-- update; the triggers stamp rows written by other tools. A deleted
+-- subscription, or the old address of one whose email changes, leaves a
+-- tombstone so the deletion can be passed on downstream.
+ALTER TABLE email_subscriptions ADD COLUMN updated_at TEXT;
+
+UPDATE email_subscriptions
+SET updated_at = COALESCE(strftime('%Y-%m-%d %H:%M:%f', subscribed_at),
+                          strftime('%Y-%m-%d %H:%M:%f', 'now'));
+
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_updated_at
+    ON email_subscriptions(updated_at);
+
+CREATE TRIGGER IF NOT EXISTS trg_updated_at_insert
+AFTER INSERT ON email_subscriptions
+WHEN NEW.updated_at IS NULL
+BEGIN
+    UPDATE email_subscriptions SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_updated_at_update
+AFTER UPDATE OF email, status, source, notes ON email_subscriptions
+WHEN NEW.updated_at IS OLD.updated_at
+ AND (NEW.email IS NOT OLD.email OR NEW.status IS NOT OLD.status
+      OR NEW.source IS NOT OLD.source OR NEW.notes IS NOT OLD.notes)
+BEGIN
+    UPDATE email_subscriptions SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE id = NEW.id;
+END;
+
+CREATE TABLE IF NOT EXISTS subscription_tombstones (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    subscription_id INTEGER NOT NULL,
+    email TEXT NOT NULL,
+    deleted_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_subscription_tombstones_deleted_at
+    ON subscription_tombstones(deleted_at);
+
+CREATE TRIGGER IF NOT EXISTS trg_tombstone_delete
+AFTER DELETE ON email_subscriptions
+BEGIN
+    INSERT INTO subscription_tombstones (subscription_id, email, deleted_at)
+        VALUES (OLD.id, OLD.email, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tombstone_email_change
+AFTER UPDATE OF email ON email_subscriptions
+WHEN NEW.email IS NOT OLD.email
+BEGIN
+    INSERT INTO subscription_tombstones (subscription_id, email, deleted_at)
+        VALUES (OLD.id, OLD.email, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+END;
+
+-- One row per delta export destination. watermark is the newest change
+-- already exported there; NULL means the next export is a full one.
+CREATE TABLE IF NOT EXISTS export_watermarks (
+    destination TEXT PRIMARY KEY,
+    watermark TEXT,
+    last_filename TEXT,
+    last_rows INTEGER NOT NULL DEFAULT 0,
+    exported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,38 @@
+-- Leave email_key to the writer that supplies it (see 0005_email_key.sql)
+--
+-- The 0005 update trigger also fired when DatabaseManager wrote a new email
+-- together with a key equal to the old one (a provider alias of the same
+-- mailbox) and replaced that key with lower(trim(email)). DatabaseManager
+-- now clears the key before it changes an email and writes the new key
+-- with the email, so the trigger only sees writers that leave the key alone.
+--
+-- SQLite's lower() and trim() only handle ASCII while normalize_email uses
+-- Python's str.strip() and str.lower(). The triggers therefore only fill
+-- in keys for ASCII addresses, trimming the same whitespace as str.strip();
+-- other addresses keep a NULL key, and keys computed in SQL for them are
+-- cleared, for DatabaseManager to compute in Python (see migrate()).
+DROP TRIGGER IF EXISTS trg_email_key_insert;
+DROP TRIGGER IF EXISTS trg_email_key_update;
+
+UPDATE email_subscriptions SET email_key = NULL
+WHERE length(CAST(email AS BLOB)) != length(email);
+
+CREATE TRIGGER IF NOT EXISTS trg_email_key_insert
+AFTER INSERT ON email_subscriptions
+WHEN NEW.email_key IS NULL AND length(CAST(NEW.email AS BLOB)) = length(NEW.email)
+BEGIN
+    UPDATE email_subscriptions
+    SET email_key = lower(trim(NEW.email, ' ' || char(9, 10, 11, 12, 13, 28, 29, 30, 31)))
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_email_key_update
+AFTER UPDATE OF email ON email_subscriptions
+WHEN NEW.email IS NOT OLD.email AND NEW.email_key IS OLD.email_key
+BEGIN
+    UPDATE email_subscriptions
+    SET email_key = CASE WHEN length(CAST(NEW.email AS BLOB)) = length(NEW.email)
+                         THEN lower(trim(NEW.email, ' ' || char(9, 10, 11, 12, 13, 28, 29, 30, 31)))
+                    END
+    WHERE id = NEW.id;
+END;
@@ -0,0 +1,120 @@
+-- Change numbers for delta exports (DatabaseManager.export_changes_since)
+--
+-- Timestamps from 0007_change_tracking.sql make a poor watermark: two
+-- changes stamped in the same millisecond can straddle an export, and a
+-- clock stepping back hides changes behind it. Every change now also takes
+-- a number from change_sequence. SQLite has a single writer, so a change
+-- committed later always has a larger number, and export_watermarks keeps
+-- the largest number exported to each destination.
+--
+-- DatabaseManager bumps the counter once per write (see
+-- NEXT_CHANGE_SEQ_SQL) and stamps its rows with it; the triggers bump it
+-- for each row other writers change and for each tombstone.
+CREATE TABLE IF NOT EXISTS change_sequence (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    value INTEGER NOT NULL
+);
+
+ALTER TABLE email_subscriptions ADD COLUMN change_seq INTEGER;
+ALTER TABLE subscription_tombstones ADD COLUMN change_seq INTEGER;
+
+-- Backfill: number the existing changes in timestamp order, deletes first
+-- on a tie as the timestamp-based export sorted them
+CREATE TEMP TABLE change_seq_backfill AS
+SELECT change, id, changed_at,
+       ROW_NUMBER() OVER (ORDER BY changed_at, change, id) AS seq
+FROM (
+    SELECT 'upsert' AS change, id, updated_at AS changed_at FROM email_subscriptions
+    UNION ALL
+    SELECT 'delete', id, deleted_at FROM subscription_tombstones
+);
+
+CREATE INDEX temp.idx_change_seq_backfill ON change_seq_backfill(change, id);
+
+UPDATE email_subscriptions SET change_seq = (
+    SELECT seq FROM change_seq_backfill b WHERE b.change = 'upsert' AND b.id = email_subscriptions.id
+);
+UPDATE subscription_tombstones SET change_seq = (
+    SELECT seq FROM change_seq_backfill b WHERE b.change = 'delete' AND b.id = subscription_tombstones.id
+);
+
+INSERT INTO change_sequence (id, value)
+SELECT 1, COUNT(*) FROM change_seq_backfill;
+
+-- Watermarks become the number of the newest change at or before the old
+-- timestamp; NULL (next export is a full one) stays NULL
+CREATE TABLE export_watermarks_new (
+    destination TEXT PRIMARY KEY,
+    watermark INTEGER,
+    last_filename TEXT,
+    last_rows INTEGER NOT NULL DEFAULT 0,
+    exported_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO export_watermarks_new (destination, watermark, last_filename, last_rows, exported_at)
+SELECT destination,
+       CASE WHEN watermark IS NOT NULL THEN
+           (SELECT COALESCE(MAX(seq), 0) FROM change_seq_backfill WHERE changed_at <= watermark)
+       END,
+       last_filename, last_rows, exported_at
+FROM export_watermarks;
+
+DROP TABLE export_watermarks;
+ALTER TABLE export_watermarks_new RENAME TO export_watermarks;
+DROP TABLE change_seq_backfill;
+
+-- updated_at stays as the time of the latest change but is no longer
+-- queried by delta exports
+DROP INDEX IF EXISTS idx_email_subscriptions_updated_at;
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_change_seq
+    ON email_subscriptions(change_seq);
+CREATE INDEX IF NOT EXISTS idx_subscription_tombstones_change_seq
+    ON subscription_tombstones(change_seq);
+
+CREATE TRIGGER IF NOT EXISTS trg_change_seq_insert
+AFTER INSERT ON email_subscriptions
+WHEN NEW.change_seq IS NULL
+BEGIN
+    UPDATE change_sequence SET value = value + 1;
+    UPDATE email_subscriptions SET change_seq = (SELECT value FROM change_sequence)
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_change_seq_update
+AFTER UPDATE OF email, status, source, notes ON email_subscriptions
+WHEN NEW.change_seq IS OLD.change_seq
+ AND (NEW.email IS NOT OLD.email OR NEW.status IS NOT OLD.status
+      OR NEW.source IS NOT OLD.source OR NEW.notes IS NOT OLD.notes)
+BEGIN
+    UPDATE change_sequence SET value = value + 1;
+    UPDATE email_subscriptions SET change_seq = (SELECT value FROM change_sequence)
+    WHERE id = NEW.id;
+END;
+
+-- Tombstones always take a new number. When an email changes, the row is
+-- renumbered after its tombstone so the delete of the old address is
+-- exported before the upsert of the new one.
+DROP TRIGGER IF EXISTS trg_tombstone_delete;
+DROP TRIGGER IF EXISTS trg_tombstone_email_change;
+
+CREATE TRIGGER IF NOT EXISTS trg_tombstone_delete
+AFTER DELETE ON email_subscriptions
+BEGIN
+    UPDATE change_sequence SET value = value + 1;
+    INSERT INTO subscription_tombstones (subscription_id, email, deleted_at, change_seq)
+        VALUES (OLD.id, OLD.email, strftime('%Y-%m-%d %H:%M:%f', 'now'),
+                (SELECT value FROM change_sequence));
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_tombstone_email_change
+AFTER UPDATE OF email ON email_subscriptions
+WHEN NEW.email IS NOT OLD.email
+BEGIN
+    UPDATE change_sequence SET value = value + 1;
+    INSERT INTO subscription_tombstones (subscription_id, email, deleted_at, change_seq)
+        VALUES (OLD.id, OLD.email, strftime('%Y-%m-%d %H:%M:%f', 'now'),
+                (SELECT value FROM change_sequence));
+    UPDATE change_sequence SET value = value + 1;
+    UPDATE email_subscriptions SET change_seq = (SELECT value FROM change_sequence)
+    WHERE id = NEW.id;
+END;
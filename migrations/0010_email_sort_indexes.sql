@@ -0,0 +1,15 @@
+-- Indexes for every sort column of the keyset-paginated subscription list
+-- (DatabaseManager.get_email_subscriptions_page), with and without a
+-- status filter, so each page is an index range scan rather than a sort
+-- of the whole table.
+--
+-- source is sorted as COALESCE(source, '') (see EMAIL_SORT_COLUMNS); an
+-- index on that exact expression is what lets SQLite use it.
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_source_sort
+    ON email_subscriptions(COALESCE(source, ''), id);
+
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_status_source_sort
+    ON email_subscriptions(status, COALESCE(source, ''), id);
+
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_status_email
+    ON email_subscriptions(status, email, id);
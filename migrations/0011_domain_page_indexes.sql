@@ -0,0 +1,14 @@
+-- Indexes matching the default order of the subscription list (newest
+-- first, ties on id) under a domain filter, alone or with a status filter.
+-- The (domain, status) index finds the rows but leaves them to be sorted
+-- in a temp B-tree on every page; these return a page straight from the
+-- index.
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_domain_subscribed
+    ON email_subscriptions(domain, subscribed_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_email_subscriptions_domain_status_subscribed
+    ON email_subscriptions(domain, status, subscribed_at, id);
+
+-- The (domain, status) index from 0004_email_domain.sql is a prefix of the
+-- second one and would only cost writes
+DROP INDEX IF EXISTS idx_email_subscriptions_domain_status;
@@ -0,0 +1,14 @@
+-- Settings that every process opening the database must agree on
+--
+-- email_provider_rules decides how email_key is computed. As a
+-- per-process option, a process with the rules and one without computed
+-- different keys for the same address, and the unique index let the
+-- duplicates through. It now lives here ('1' or '0');
+-- DatabaseManager reads it on open and set_email_provider_rules()
+-- recomputes every key when it changes.
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+INSERT OR IGNORE INTO settings (name, value) VALUES ('email_provider_rules', '0');
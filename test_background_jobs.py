@@ -0,0 +1,76 @@
+"""
+Tests for the background job queue, each on a temporary database
+"""
+
+import sqlite3
+import threading
+import time
+
+from background_jobs import JobQueue
+
+
+def wait_for(queue, timeout=10):
+    deadline = time.monotonic() + timeout
+    while queue.active_jobs():
+        assert time.monotonic() < deadline, "jobs did not finish"
+        time.sleep(0.01)
+
+
+def test_writing_jobs_run_one_at_a_time(db, write_csv):
+    filename = write_csv("emails.csv", [f"user{i}@example.com,active,test," for i in range(10)])
+
+    def hold_write_lock(db, progress):
+        # Longer than the fixture's busy timeout
+        db.conn.execute("BEGIN IMMEDIATE")
+        time.sleep(0.5)
+        db.conn.commit()
+
+    queue = JobQueue(db, max_workers=2)
+    try:
+        holder = queue.submit("Hold the write lock", hold_write_lock, writes=True)
+        importer = queue.submit("Import", lambda db, progress: db.import_emails_from_csv(filename),
+                                writes=True)
+        wait_for(queue)
+    finally:
+        queue.shutdown()
+    assert holder.status == 'done'
+    assert importer.status == 'done', importer.error
+    assert importer.result.successful == 10
+
+
+def test_failed_import_job_is_reported_as_failed(db, write_csv):
+    filename = write_csv("emails.csv", ["user@example.com,active,test,"])
+    queue = JobQueue(db)
+    try:
+        with sqlite3.connect(db.db_name) as other:
+            other.execute("BEGIN IMMEDIATE")
+            job = queue.submit("Import", lambda db, progress: db.import_emails_from_csv(filename),
+                               writes=True)
+            wait_for(queue)
+            other.rollback()
+    finally:
+        queue.shutdown()
+    assert job.status == 'failed'
+    assert isinstance(job.error, sqlite3.OperationalError)
+
+
+def test_reads_run_while_writes_are_queued(db):
+    release = threading.Event()
+
+    def write(db, progress):
+        release.wait(5)
+
+    queue = JobQueue(db, max_workers=2)
+    try:
+        writers = [queue.submit(f"Write {n}", write, writes=True) for n in range(2)]
+        reader = queue.submit("Read", lambda db, progress: db.count_email_subscriptions())
+        deadline = time.monotonic() + 1
+        while not reader.finished and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert reader.status == 'done'
+        assert writers[1].status == 'queued'
+        release.set()
+        wait_for(queue)
+    finally:
+        release.set()
+        queue.shutdown()
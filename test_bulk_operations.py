@@ -0,0 +1,52 @@
+"""
+Tests for the set-based bulk subscription operations, each on a temporary database
+"""
+
+import sqlite3
+
+import pytest
+
+import cli_app
+
+
+def test_bulk_create_skips_only_duplicates(db):
+    db.create_email_subscription("taken@example.com")
+    created = db.bulk_create_email_subscriptions([
+        {'email': "new@example.com"},
+        {'email': "Taken@Example.com"},
+        {'email': "other@example.com", 'status': 'bounced'},
+    ])
+    assert created == 2
+    assert db.count_email_subscriptions() == 3
+
+
+def test_bulk_create_without_skipping_raises_on_a_duplicate(db):
+    db.create_email_subscription("taken@example.com")
+    with pytest.raises(sqlite3.IntegrityError):
+        db.bulk_create_email_subscriptions([{'email': "new@example.com"}, {'email': "TAKEN@example.com"}],
+                                           skip_duplicates=False)
+    assert db.count_email_subscriptions() == 1
+
+
+@pytest.mark.parametrize('bad', [{'email': "typo@example.com", 'status': 'actve'}, {'email': "  "}, {}])
+def test_bulk_create_rejects_invalid_rows(db, bad):
+    with pytest.raises(ValueError):
+        db.bulk_create_email_subscriptions([{'email': "fine@example.com"}, bad])
+    assert db.count_email_subscriptions() == 0
+
+
+def test_bulk_status_update_leaves_unchanged_rows_alone(db, tmp_path):
+    db.bulk_create_email_subscriptions(
+        {'email': f"user{i}@example.com", 'status': 'bounced' if i < 3 else 'unsubscribed'} for i in range(20)
+    )
+    db.export_changes_since("esp", filename=str(tmp_path / "full.csv"))
+    assert db.bulk_update_email_status('unsubscribed', domain='example.com') == 3
+    delta = db.export_changes_since("esp", filename=str(tmp_path / "delta.csv"))
+    assert (delta['upserts'], delta['deletes']) == (3, 0)
+
+
+def test_bulk_selection_asks_again_after_a_typo(monkeypatch, capsys):
+    answers = iter(["1, 2, x3", "1, 2,3"])
+    monkeypatch.setattr('builtins.input', lambda prompt: next(answers))
+    assert cli_app.read_bulk_selection() == ([1, 2, 3], {})
+    assert "Invalid IDs" in capsys.readouterr().out
@@ -0,0 +1,85 @@
+"""
+Tests for the connection pool and DatabaseManager's use of it
+"""
+
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from connection_pool import ConnectionPool, PoolTimeoutError
+from database import DatabaseManager
+
+
+@pytest.fixture
+def pool():
+    pool = ConnectionPool(lambda: sqlite3.connect(':memory:', check_same_thread=False),
+                          max_size=2, timeout=0.1)
+    yield pool
+    pool.close()
+
+
+def test_stats_count_hits_and_misses(pool):
+    with pool.connection() as first:
+        with pool.connection():
+            stats = pool.get_stats()
+            assert (stats['open'], stats['in_use'], stats['idle']) == (2, 2, 0)
+    with pool.connection() as reused:
+        assert reused is first
+    stats = pool.get_stats()
+    assert (stats['hits'], stats['misses'], stats['waits']) == (1, 2, 0)
+    assert (stats['open'], stats['in_use'], stats['idle']) == (2, 0, 2)
+
+
+def test_checkout_times_out_when_the_pool_is_exhausted(pool):
+    with pool.connection(), pool.connection():
+        started = time.monotonic()
+        with pytest.raises(PoolTimeoutError):
+            pool.checkout()
+        assert time.monotonic() - started >= 0.1
+    assert pool.get_stats()['in_use'] == 0
+
+
+def test_checkout_waits_for_a_checkin(pool):
+    held = [pool.checkout(), pool.checkout()]
+    threading.Timer(0.05, pool.checkin, (held[0],)).start()
+    assert pool.checkout() is held[0]
+    stats = pool.get_stats()
+    assert stats['waits'] == 1
+    assert 0 < stats['max_wait_time'] == stats['total_wait_time'] == stats['avg_wait_time']
+
+
+def test_checkin_rolls_back_an_open_transaction(pool):
+    conn = pool.checkout()
+    conn.execute("CREATE TABLE t (x)")
+    conn.execute("INSERT INTO t VALUES (1)")
+    assert conn.in_transaction
+    pool.checkin(conn)
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_threads_use_their_own_connections(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"), pool_size=3)
+    try:
+        connections = []
+        barrier = threading.Barrier(2)
+
+        def work():
+            with db.connection() as conn:
+                # Nested use on the same thread reuses the checked out connection
+                with db.connection() as nested:
+                    assert nested is conn
+                connections.append(conn)
+                barrier.wait(5)
+
+        threads = [threading.Thread(target=work) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(connections) == 2 and connections[0] is not connections[1]
+        assert db.get_pool_stats()['in_use'] == 0
+    finally:
+        db.close()
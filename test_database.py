@@ -10,6 +10,7 @@ def test_database():
     
     # Initialize database
     db = DatabaseManager()
+    db.seed_sample_data()
     
     # Test departments
     print("\n1. Testing Departments:")
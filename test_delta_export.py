@@ -0,0 +1,68 @@
+"""
+Tests for delta exports (export_changes_since), each on a temporary database
+"""
+
+import csv
+import sqlite3
+
+
+def read_changes(filename):
+    with open(filename, newline='', encoding='utf-8') as f:
+        return [(row['change'], int(row['id']), row['email']) for row in csv.DictReader(f)]
+
+
+def test_changes_in_the_same_millisecond_are_not_lost(db, tmp_path):
+    subscription_id = db.create_email_subscription("user@example.com")
+    db.export_changes_since("esp", filename=str(tmp_path / "full.csv"))
+    for attempt in range(50):
+        db.update_email_subscription(subscription_id, notes=f"first {attempt}")
+        first = db.export_changes_since("esp", filename=str(tmp_path / "first.csv"))
+        db.update_email_subscription(subscription_id, notes=f"second {attempt}")
+        second = db.export_changes_since("esp", filename=str(tmp_path / "second.csv"))
+        assert (first['upserts'], second['upserts']) == (1, 1)
+        assert second['watermark'] > first['watermark']
+
+
+def test_email_change_exports_delete_before_upsert(db, tmp_path):
+    kept = db.create_email_subscription("kept@example.com")
+    renamed = db.create_email_subscription("old@example.com")
+    removed = db.create_email_subscription("gone@example.com")
+    db.export_changes_since("esp", filename=str(tmp_path / "full.csv"))
+
+    db.update_email_subscription(renamed, email="new@example.com")
+    db.delete_email_subscription(removed)
+    # Writers other than DatabaseManager are numbered by the triggers
+    with sqlite3.connect(db.db_name) as other:
+        other.execute("UPDATE email_subscriptions SET status = 'bounced' WHERE id = ?", (kept,))
+
+    result = db.export_changes_since("esp", filename=str(tmp_path / "changes.csv"))
+    assert read_changes(result['filename']) == [
+        ('delete', renamed, "old@example.com"),
+        ('upsert', renamed, "new@example.com"),
+        ('delete', removed, "gone@example.com"),
+        ('upsert', kept, "kept@example.com"),
+    ]
+    # Every destination has the tombstones now
+    assert db.export_changes_since("esp", filename=str(tmp_path / "none.csv"))['deletes'] == 0
+
+
+def test_first_export_of_an_empty_table_sets_the_watermark(db, tmp_path):
+    first = db.export_changes_since("esp", filename=str(tmp_path / "full.csv"))
+    assert first['upserts'] == 0 and first['watermark'] is not None
+    subscription_id = db.create_email_subscription("user@example.com")
+    db.create_email_subscription("other@example.com")
+    db.delete_email_subscription(subscription_id)
+    delta = db.export_changes_since("esp", filename=str(tmp_path / "delta.csv"))
+    assert delta['since'] == first['watermark']
+    assert read_changes(delta['filename']) == [
+        ('upsert', 2, "other@example.com"), ('delete', subscription_id, "user@example.com"),
+    ]
+
+
+def test_full_export_watermark_covers_trailing_deletes(db, tmp_path):
+    db.create_email_subscription("kept@example.com")
+    removed = db.create_email_subscription("gone@example.com")
+    db.delete_email_subscription(removed)
+    db.export_changes_since("esp", filename=str(tmp_path / "full.csv"))
+    delta = db.export_changes_since("esp", filename=str(tmp_path / "delta.csv"))
+    assert (delta['upserts'], delta['deletes']) == (0, 0)
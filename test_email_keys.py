@@ -0,0 +1,86 @@
+"""
+Tests for the normalized email_key, each on a temporary database
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+from database import DatabaseManager, MIGRATIONS_DIR
+
+
+def test_provider_alias_update_keeps_normalized_key(tmp_path):
+    db = DatabaseManager(str(tmp_path / "test.db"), email_provider_rules=True)
+    try:
+        subscription_id = db.create_email_subscription("john@gmail.com")
+        db.update_email_subscription(subscription_id, email="J.ohn+x@gmail.com")
+        assert db.get_email_subscription(subscription_id)['email_key'] == "john@gmail.com"
+        assert db.get_email_subscription_by_email("john@gmail.com")['id'] == subscription_id
+    finally:
+        db.close()
+
+
+def test_update_to_taken_key_is_rolled_back(db):
+    first = db.create_email_subscription("first@example.com")
+    db.create_email_subscription("second@example.com")
+    with pytest.raises(sqlite3.IntegrityError):
+        db.update_email_subscription(first, email="Second@example.com")
+    assert db.get_email_subscription(first)['email_key'] == "first@example.com"
+
+
+def test_failed_update_caught_inside_a_block_keeps_the_key(db):
+    first = db.create_email_subscription("first@example.com")
+    db.create_email_subscription("second@example.com")
+    with db.transaction():
+        with pytest.raises(sqlite3.IntegrityError):
+            db.update_email_subscription(first, email="second@example.com")
+    assert db.get_email_subscription(first)['email_key'] == "first@example.com"
+    with pytest.raises(sqlite3.IntegrityError):
+        db.create_email_subscription("FIRST@example.com")
+
+
+def test_keys_written_by_other_tools_match_python(db):
+    with sqlite3.connect(db.db_name) as other:
+        other.execute("INSERT INTO email_subscriptions (email) VALUES (' Plain@Example.com\t')")
+        other.execute("INSERT INTO email_subscriptions (email) VALUES ('ÉVA@Example.com')")
+    db.fill_email_keys()
+    keys = {row['email']: row['email_key'] for row in db.get_all_email_subscriptions()}
+    assert keys == {" Plain@Example.com\t": "plain@example.com", "ÉVA@Example.com": "éva@example.com"}
+
+
+def test_migration_recomputes_non_ascii_keys(db):
+    with sqlite3.connect(db.db_name) as conn:
+        # A key as the 0005 triggers computed it: lower() leaves É alone
+        conn.execute("INSERT INTO email_subscriptions (email, email_key) VALUES ('ÉVA@x.com', 'Éva@x.com')")
+        with open(os.path.join(MIGRATIONS_DIR, '0008_email_key_writers.sql'), encoding='utf-8') as f:
+            conn.executescript(f.read())
+    db.fill_email_keys()
+    assert db.get_email_subscription_by_email("éva@x.com")['email'] == "ÉVA@x.com"
+
+
+def test_provider_rules_setting_is_shared_through_the_database(tmp_path):
+    path = str(tmp_path / "test.db")
+    DatabaseManager(path, email_provider_rules=True).close()
+    db = DatabaseManager(path)
+    try:
+        assert db.email_provider_rules
+        db.create_email_subscription("john@gmail.com")
+        with pytest.raises(sqlite3.IntegrityError):
+            db.create_email_subscription("J.ohn+news@googlemail.com")
+    finally:
+        db.close()
+
+
+def test_switching_provider_rules_recomputes_keys(db):
+    kept = db.create_email_subscription("john@gmail.com")
+    db.create_email_subscription("j.ohn+news@gmail.com", status='unsubscribed')
+    report = db.set_email_provider_rules(True)
+    assert (report['groups'], report['removed']) == (1, 1)
+    assert db.get_email_subscription(kept)['status'] == 'unsubscribed'
+    assert db.get_email_subscription_by_email("jo.hn@googlemail.com")['id'] == kept
+    assert db.set_email_provider_rules(True) is None
+
+    db.set_email_provider_rules(False)
+    assert db.get_email_subscription(kept)['email_key'] == "john@gmail.com"
+    assert db.get_email_subscription_by_email("jo.hn@googlemail.com") is None
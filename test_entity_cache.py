@@ -0,0 +1,99 @@
+"""
+Tests for the entity cache and DatabaseManager's invalidation of it
+"""
+
+import threading
+
+import pytest
+
+import database
+from database import DatabaseManager
+from entity_cache import EntityCache
+
+
+@pytest.fixture
+def cached_db(tmp_path, monkeypatch):
+    monkeypatch.setitem(database.PERFORMANCE_PROFILES['balanced'], 'busy_timeout', 100)
+    manager = DatabaseManager(str(tmp_path / "test.db"), cache_size=100)
+    yield manager
+    manager.close()
+
+
+def test_put_after_an_invalidation_is_skipped():
+    cache = EntityCache(10)
+    generation = cache.generation('subscription')
+    cache.invalidate(('subscription', 1))
+    cache.put(('subscription', 1), {'id': 1}, generation=generation)
+    assert cache.get(('subscription', 1)) is None
+
+    generation = cache.generation('subscription')
+    cache.invalidate(('employee', 1))
+    cache.put(('subscription', 1), {'id': 1}, generation=generation)
+    assert cache.get(('subscription', 1)) == {'id': 1}
+
+
+def test_invalidating_an_alias_drops_the_entry():
+    cache = EntityCache(10)
+    cache.put(('subscription', 1), {'id': 1}, aliases=[('subscription_email', 'a@x.com')])
+    assert cache.get(('subscription_email', 'a@x.com')) == {'id': 1}
+    cache.invalidate(('subscription_email', 'a@x.com'))
+    assert cache.get(('subscription', 1)) is None
+
+
+def test_writes_invalidate_cached_rows(cached_db):
+    db = cached_db
+    db.seed_sample_data()
+    employee = db.get_all_employees()[0]
+    department = db.get_all_departments()[0]
+    subscription_id = db.create_email_subscription("user@example.com")
+
+    db.get_employee(employee['id'])
+    db.update_employee(employee['id'], position="Changed")
+    assert db.get_employee(employee['id'])['position'] == "Changed"
+
+    db.get_department(department['id'])
+    db.update_department(department['id'], name="Renamed")
+    assert db.get_department(department['id'])['name'] == "Renamed"
+
+    assert db.get_email_subscription_by_email("USER@example.com")['status'] == 'active'
+    db.update_email_subscription(subscription_id, status='bounced')
+    assert db.get_email_subscription_by_email("user@example.com")['status'] == 'bounced'
+    db.bulk_update_email_status('unsubscribed', ids=[subscription_id])
+    assert db.get_email_subscription(subscription_id)['status'] == 'unsubscribed'
+    db.bulk_delete_email_subscriptions(ids=[subscription_id])
+    assert db.get_email_subscription(subscription_id) is None
+
+
+def test_seed_and_fill_email_keys_invalidate(cached_db):
+    db = cached_db
+    assert db.get_department(1) is None
+    db.seed_sample_data()
+    assert db.get_department(1) is not None
+
+    subscription_id = db.create_email_subscription("user@example.com")
+    with db.transaction() as conn:
+        conn.execute("UPDATE email_subscriptions SET email_key = NULL WHERE id = ?", (subscription_id,))
+    # Written behind the manager's back, so only the fill below invalidates
+    db.cache.clear()
+    assert db.get_email_subscription(subscription_id)['email_key'] is None
+    assert db.fill_email_keys() == 1
+    assert db.get_email_subscription(subscription_id)['email_key'] == "user@example.com"
+
+
+def test_row_read_before_a_concurrent_write_is_not_cached(cached_db, monkeypatch):
+    db = cached_db
+    subscription_id = db.create_email_subscription("user@example.com", notes="old")
+    cache_subscription = db._cache_subscription
+
+    def write_then_cache(subscription, generation=None):
+        # Another thread commits a change between this thread's read and its put
+        writer = threading.Thread(target=db.update_email_subscription,
+                                  args=(subscription_id,), kwargs={'notes': "new"})
+        writer.start()
+        writer.join()
+        cache_subscription(subscription, generation)
+
+    monkeypatch.setattr(db, '_cache_subscription', write_then_cache)
+    assert db.get_email_subscription(subscription_id)['notes'] == "old"
+    monkeypatch.undo()
+    assert db.get_email_subscription(subscription_id)['notes'] == "new"
@@ -0,0 +1,20 @@
+"""
+Tests for file exports, each on a temporary database
+"""
+
+import bz2
+import os
+
+import pytest
+
+
+def test_compression_level_outside_codec_range_is_rejected(db, tmp_path):
+    db.create_email_subscription("user@example.com")
+    filename = str(tmp_path / "emails.csv.bz2")
+    with pytest.raises(ValueError, match="bz2 compression levels go from 1 to 9"):
+        db.export_emails_to_csv(filename, compression_level=0)
+    assert not os.path.exists(filename)
+
+    assert db.export_emails_to_csv(filename, compression_level=1)
+    with bz2.open(filename, 'rt', encoding='utf-8') as f:
+        assert "user@example.com" in f.read()
@@ -0,0 +1,66 @@
+"""
+Tests for CSV imports and import jobs, each on a temporary database
+"""
+
+import sqlite3
+
+import pytest
+
+from database import OperationCancelled
+
+
+def test_import_raises_when_database_is_locked(db, write_csv):
+    filename = write_csv("emails.csv", [f"user{i}@example.com,active,test," for i in range(10)])
+    with sqlite3.connect(db.db_name) as other:
+        other.execute("BEGIN IMMEDIATE")
+        with pytest.raises(sqlite3.OperationalError):
+            db.import_emails_from_csv(filename)
+        other.rollback()
+    assert db.count_email_subscriptions() == 0
+
+
+def test_interrupted_import_resumes_from_last_block(db, write_csv):
+    filename = write_csv("emails.csv", [f"user{i}@example.com,active,test," for i in range(500)])
+
+    def stop_after_two_blocks(rows_read, fraction):
+        if calls.append(rows_read) or len(calls) == 2:
+            raise OperationCancelled()
+
+    calls = []
+    with pytest.raises(OperationCancelled):
+        db.import_emails_from_csv(filename, chunk_bytes=1024, progress=stop_after_two_blocks)
+    job, = db.get_import_jobs()
+    # Both blocks were committed with their checkpoints before progress ran
+    assert 0 < job['rows_read'] == calls[-1] < 500
+    assert db.count_email_subscriptions() == calls[-1]
+
+    result = db.resume_import_job(job['id'])
+    assert (result.successful, result.failed, result.skipped) == (500, 0, 0)
+    assert db.count_email_subscriptions() == 500
+    assert db.get_import_jobs() == []
+
+
+def test_stray_quote_does_not_split_later_rows(db, write_csv):
+    rows = [f"user{i}@example.com,active,test," for i in range(20)]
+    rows.insert(2, 'tall@example.com,active,test,5ft 10" tall')
+    rows.insert(10, 'multi@example.com,active,test,"first line\nsecond line"')
+    filename = write_csv("emails.csv", rows)
+    result = db.import_emails_from_csv(filename, chunk_bytes=64)
+    assert (result.successful, result.failed, result.reject_file) == (22, 0, None)
+    assert db.get_email_subscription_by_email("tall@example.com")['notes'] == '5ft 10" tall'
+    assert db.get_email_subscription_by_email("multi@example.com")['notes'] == "first line\nsecond line"
+
+
+def test_import_inside_a_block_rolls_back_completely_when_cancelled(db, write_csv):
+    filename = write_csv("emails.csv", [f"user{i}@example.com,active,test," for i in range(500)])
+
+    def stop_after_two_blocks(rows_read, fraction):
+        if calls.append(rows_read) or len(calls) == 2:
+            raise OperationCancelled()
+
+    calls = []
+    with pytest.raises(OperationCancelled):
+        with db.transaction():
+            db.import_emails_from_csv(filename, chunk_bytes=1024, progress=stop_after_two_blocks)
+    assert db.count_email_subscriptions() == 0
+    assert db.get_import_jobs(unfinished_only=False) == []
@@ -0,0 +1,57 @@
+"""
+Tests for keyset pagination of the subscription list, each on a temporary database
+"""
+
+import pytest
+
+from database import EMAIL_SORT_COLUMNS
+
+
+def page_plans(db, **filters):
+    """Query plan of a deep page for every sort column and direction"""
+    plans = {}
+    with db.connection() as conn:
+        for sort_by in EMAIL_SORT_COLUMNS:
+            for descending in (True, False):
+                statements = []
+                conn.set_trace_callback(statements.append)
+                db.get_email_subscriptions_page(after=('m', 50), sort_by=sort_by,
+                                                descending=descending, **filters)
+                conn.set_trace_callback(None)
+                plan = conn.execute("EXPLAIN QUERY PLAN " + statements[-1]).fetchall()
+                plans[sort_by, descending] = ' / '.join(row[3] for row in plan)
+    return plans
+
+
+@pytest.mark.parametrize('filters', [{}, {'status': 'active'}])
+def test_pages_are_index_range_scans(db, filters):
+    for key, plan in page_plans(db, **filters).items():
+        assert 'TEMP B-TREE' not in plan, key
+        if key[0] != 'status' or not filters:
+            assert plan.startswith('SEARCH'), (key, plan)
+
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_paging_by_source_visits_every_row_once(db, descending):
+    sources = [None, '', 'web', 'import', 'web', None, 'ads']
+    db.bulk_create_email_subscriptions(
+        {'email': f"user{i}@example.com", 'source': sources[i % len(sources)]} for i in range(50)
+    )
+    seen, after = [], None
+    while True:
+        page = db.get_email_subscriptions_page(after=after, limit=7, sort_by='source', descending=descending)
+        if not page:
+            break
+        seen.extend(page)
+        after = (page[-1]['source'], page[-1]['id'])
+    expected = sorted(db.get_all_email_subscriptions(), key=lambda s: (s['source'] or '', s['id']),
+                      reverse=descending)
+    assert [s['id'] for s in seen] == [s['id'] for s in expected]
+
+
+@pytest.mark.parametrize('filters', [{'domain': 'example.com'}, {'domain': 'example.com', 'status': 'active'}])
+def test_domain_pages_in_default_order_are_answered_from_an_index(db, filters):
+    plans = page_plans(db, **filters)
+    for descending in (True, False):
+        plan = plans['subscribed_at', descending]
+        assert 'TEMP B-TREE' not in plan and 'subscribed_at' in plan, plan
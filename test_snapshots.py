@@ -0,0 +1,46 @@
+"""
+Tests for snapshots and online backups, each on a temporary database
+"""
+
+import cli_app
+
+
+def test_snapshot_reads_one_moment(db, tmp_path):
+    db.create_email_subscription("before@example.com")
+    with db.snapshot() as snap:
+        db.create_email_subscription("after@example.com")
+        assert snap.get_statistics()['total_subscriptions'] == 1
+        filename = str(tmp_path / "subscribers.csv")
+        assert snap.export_emails_to_csv(filename)
+    with open(filename, encoding='utf-8') as f:
+        assert "before@example.com" in f.read()
+    assert db.get_statistics()['total_subscriptions'] == 2
+
+
+def test_statistics_report_can_read_a_snapshot(db, monkeypatch, capsys):
+    db.create_email_subscription("user@example.com")
+    opened = []
+    snapshot = db.snapshot
+
+    def tracked_snapshot(*args, **kwargs):
+        opened.append(True)
+        return snapshot(*args, **kwargs)
+
+    monkeypatch.setattr(db, 'snapshot', tracked_snapshot)
+    monkeypatch.setattr('builtins.input', lambda prompt: "yes")
+    cli_app.view_statistics(db)
+    assert opened
+    out = capsys.readouterr().out
+    assert "Total Email Subscriptions: 1" in out
+    assert "example.com: 1" in out
+
+
+def test_backup_progress_without_a_page_count(db, tmp_path, monkeypatch, capsys):
+    def backup(filename, pages_per_step, pause, progress=None):
+        progress(0, None)
+        progress(4, 1.0)
+        return True
+
+    monkeypatch.setattr(db, 'backup', backup)
+    assert cli_app.backup_database(db, str(tmp_path / "backup.db"))
+    assert "4 pages copied (100%)" in capsys.readouterr().out
@@ -0,0 +1,50 @@
+"""
+Tests for the trigger-maintained summary_counts table, each on a temporary database
+"""
+
+SCOPES = ('subscription_status', 'subscription_source', 'department_employees',
+          'department_supervisors', 'department_heads')
+
+
+def all_counts(db):
+    """Every scope's counts, leaving out keys whose count dropped to zero"""
+    with db.connection():
+        return {scope: {key: count for key, count in db.get_summary_counts(scope).items() if count}
+                for scope in SCOPES}
+
+
+def test_triggers_match_a_rebuild_after_mixed_writes(db, write_csv):
+    db.seed_sample_data()
+    first = db.create_email_subscription("first@example.com", source='web')
+    second = db.create_email_subscription("second@example.com")
+    db.update_email_subscription(first, status='bounced', source='ads')
+    db.update_email_subscription(second, source='web')
+    db.delete_email_subscription(first)
+    db.bulk_create_email_subscriptions(
+        {'email': f"bulk{i}@example.com", 'source': 'bulk' if i % 2 else None} for i in range(30)
+    )
+    db.bulk_update_email_status('unsubscribed', source='bulk')
+    db.bulk_delete_email_subscriptions(status='unsubscribed', subscribed_after='2000-01-01')
+    db.import_emails_from_csv(write_csv("emails.csv", [f"import{i}@example.com,bounced,csv," for i in range(10)]))
+
+    departments = db.get_all_departments()
+    employee = db.create_employee("New Hire", "hire@example.com", departments[0]['id'], is_supervisor=True)
+    db.update_employee(employee, department_id=departments[1]['id'], is_head=True)
+    moved = db.get_employees_by_department(departments[2]['id'])[0]
+    db.update_employee(moved['id'], department_id=departments[0]['id'])
+
+    maintained = all_counts(db)
+    assert maintained['subscription_status']['bounced'] == 10
+    assert sum(maintained['subscription_status'].values()) == db.count_email_subscriptions()
+    db.rebuild_summary_counts()
+    assert all_counts(db) == maintained
+
+
+def test_rebuild_repairs_drift(db):
+    db.create_email_subscription("user@example.com", source='web')
+    expected = all_counts(db)
+    with db.transaction() as conn:
+        conn.execute("UPDATE summary_counts SET count = count + 5 WHERE scope = 'subscription_source'")
+    assert all_counts(db) != expected
+    db.rebuild_summary_counts()
+    assert all_counts(db) == expected
@@ -0,0 +1,57 @@
+"""
+Tests for transaction()/batch() blocks, each on a temporary database
+"""
+
+import sqlite3
+
+import pytest
+
+
+def emails(db):
+    return sorted(s['email'] for s in db.get_all_email_subscriptions())
+
+
+def test_block_commits_once_on_exit(db):
+    with db.transaction() as conn:
+        db.create_email_subscription("a@example.com")
+        db.create_email_subscription("b@example.com")
+        assert conn.in_transaction
+        assert db.in_transaction
+    assert not db.in_transaction
+    with sqlite3.connect(db.db_name) as other:
+        assert other.execute("SELECT COUNT(*) FROM email_subscriptions").fetchone()[0] == 2
+
+
+def test_block_rolls_back_when_an_exception_escapes(db):
+    with pytest.raises(RuntimeError):
+        with db.batch():
+            db.create_email_subscription("a@example.com")
+            raise RuntimeError("stop")
+    assert not db.in_transaction
+    assert emails(db) == []
+
+
+def test_caught_inner_failure_keeps_outer_work(db):
+    with db.transaction():
+        db.create_email_subscription("a@example.com")
+        with pytest.raises(sqlite3.IntegrityError):
+            with db.transaction():
+                db.create_email_subscription("b@example.com")
+                db.create_email_subscription("A@example.com")
+        db.create_email_subscription("c@example.com")
+    assert emails(db) == ["a@example.com", "c@example.com"]
+
+
+def test_savepoints_nest_more_than_one_level(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.create_email_subscription("a@example.com")
+            with db.transaction():
+                db.create_email_subscription("b@example.com")
+                with pytest.raises(RuntimeError):
+                    with db.transaction():
+                        db.create_email_subscription("c@example.com")
+                        raise RuntimeError("inner")
+            assert emails(db) == ["a@example.com", "b@example.com"]
+            raise RuntimeError("outer")
+    assert emails(db) == []